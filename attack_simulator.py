@@ -5,7 +5,6 @@ Generates synthetic VNC events to simulate data exfiltration attacks.
 This is a benign simulation tool for testing detection capabilities.
 """
 
-import json
 import time
 import random
 from datetime import datetime
@@ -13,6 +12,7 @@ from pathlib import Path
 from typing import Dict, List, Optional
 from PIL import Image, ImageDraw
 import numpy as np
+import orjson
 
 
 class AttackSimulator:
@@ -44,14 +44,8 @@ class AttackSimulator:
         if timestamp is None:
             timestamp = time.time()
         
-        # Create a simple synthetic screenshot
-        img = Image.new('RGB', (1920, 1080), color='white')
-        draw = ImageDraw.Draw(img)
-        draw.rectangle([100, 100, 1820, 980], fill='lightblue', outline='black', width=2)
-        draw.text((960, 540), f"Screenshot {int(timestamp)}", fill='black', anchor='mm')
-        
         screenshot_path = self.screenshot_dir / f"screenshot_{int(timestamp)}.png"
-        img.save(screenshot_path)
+        self._write_screenshot(screenshot_path, timestamp)
         
         return {
             "event_type": "screenshot",
@@ -61,6 +55,14 @@ class AttackSimulator:
             "source": "vnc_client"
         }
     
+    def _write_screenshot(self, screenshot_path: Path, timestamp: float):
+        """Render a simple synthetic 1920x1080 screenshot to disk."""
+        img = Image.new('RGB', (1920, 1080), color='white')
+        draw = ImageDraw.Draw(img)
+        draw.rectangle([100, 100, 1820, 980], fill='lightblue', outline='black', width=2)
+        draw.text((960, 540), f"Screenshot {int(timestamp)}", fill='black', anchor='mm')
+        img.save(screenshot_path)
+    
     def generate_file_transfer_event(self, filename: str, size_mb: float, 
                                      timestamp: Optional[float] = None) -> Dict:
         """Generate a file transfer event."""
@@ -144,9 +146,9 @@ class AttackSimulator:
     
     def save_events(self, events: List[Dict]):
         """Save events to JSONL file (one event per line)."""
-        with open(self.events_file, 'a') as f:
-            for event in events:
-                f.write(json.dumps(event) + '\n')
+        data = b''.join([orjson.dumps(event, option=orjson.OPT_APPEND_NEWLINE) for event in events])
+        with open(self.events_file, 'ab', buffering=1 << 16) as f:
+            f.write(data)
     
     def run_attack_scenario(self, scenario: str = "mixed"):
         """
@@ -0,0 +1,35 @@
+"""
+Ahead-of-time build of the detector's numeric kernels.
+
+Optional: run ``make kernels`` or ``python -m backend.app._build_kernels``
+(requires numba and a C compiler) to compile the ``detector_kernels``
+extension next to this file. The detector imports the compiled module when it
+exists, so no JIT compilation happens on the request path; otherwise it falls
+back to a JIT or NumPy implementation. numba.pycc is pending deprecation, so
+the build is not part of ``make install``.
+"""
+from pathlib import Path
+
+
+def burst_count(timestamps, now, window):
+    """Count events whose timestamp falls within window seconds of now"""
+    start = now - window
+    count = 0
+    for i in range(timestamps.shape[0]):
+        if timestamps[i] >= start:
+            count += 1
+    return count
+
+
+def build():
+    """Compile the exported kernels into backend/app/detector_kernels"""
+    from numba.pycc import CC
+    
+    cc = CC("detector_kernels")
+    cc.output_dir = str(Path(__file__).parent)
+    cc.export("burst_count", "i8(f8[:], f8, f8)")(burst_count)
+    cc.compile()
+
+
+if __name__ == "__main__":
+    build()
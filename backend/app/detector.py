@@ -10,6 +10,49 @@ from collections import deque
 import joblib
 from backend.app.config import settings
 
+try:
+    # Ahead-of-time compiled by backend/app/_build_kernels.py
+    from backend.app.detector_kernels import burst_count
+except ImportError:
+    try:
+        from numba import njit
+        from backend.app._build_kernels import burst_count as _burst_count_kernel
+        burst_count = njit(cache=True)(_burst_count_kernel)
+    except ImportError:
+        def burst_count(timestamps: np.ndarray, now: float, window: float) -> int:
+            """Count events whose timestamp falls within window seconds of now"""
+            return int(np.count_nonzero(timestamps >= now - window))
+
+
+class EventHistory:
+    """Fixed-size ring buffer of event timestamps and sizes (SoA layout)"""
+    
+    def __init__(self, capacity: int = 100):
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.sizes = np.zeros(capacity, dtype=np.float32)
+        self.count = 0
+        self._cursor = 0
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def append(self, timestamp: float, size: float = 0.0):
+        """Record an event, overwriting the oldest one when full"""
+        self.timestamps[self._cursor] = timestamp
+        self.sizes[self._cursor] = size
+        self._cursor = (self._cursor + 1) % self.capacity
+        if self.count < self.capacity:
+            self.count += 1
+    
+    def recent_timestamps(self) -> np.ndarray:
+        """Timestamps of all stored events (unordered once wrapped)"""
+        return self.timestamps[:self.count]
+    
+    def window_mask(self, window_start: float) -> np.ndarray:
+        """Boolean mask of stored events at or after window_start"""
+        return self.timestamps[:self.count] >= window_start
+
 
 class RuleBasedDetector:
     """Rule-based detection with configurable thresholds"""
@@ -22,9 +65,9 @@ class RuleBasedDetector:
         self.rapid_file_transfer_count = 2
         self.rapid_file_transfer_window_sec = 30
         
-        self.clipboard_history = deque(maxlen=100)
-        self.screenshot_history = deque(maxlen=100)
-        self.file_transfer_history = deque(maxlen=100)
+        self.clipboard_history = EventHistory()
+        self.screenshot_history = EventHistory()
+        self.file_transfer_history = EventHistory()
     
     def check_clipboard_rule(self, event: Dict) -> Tuple[bool, str]:
         """Check clipboard size threshold"""
@@ -32,7 +75,7 @@ class RuleBasedDetector:
             return False, ""
         
         size_kb = event.get("size_kb", 0)
-        self.clipboard_history.append(event)
+        self.clipboard_history.append(event.get("timestamp", time.time()), size_kb)
         
         if size_kb > self.clipboard_threshold_kb:
             return True, f"Clipboard copy exceeds threshold: {size_kb}KB > {self.clipboard_threshold_kb}KB"
@@ -44,16 +87,17 @@ class RuleBasedDetector:
         if event.get("event_type") != "screenshot":
             return False, ""
         
-        self.screenshot_history.append(event)
         current_time = event.get("timestamp", time.time())
+        self.screenshot_history.append(current_time)
         
-        recent_screenshots = [
-            e for e in self.screenshot_history
-            if current_time - e.get("timestamp", 0) <= self.screenshot_burst_window_sec
-        ]
+        recent_screenshots = int(burst_count(
+            self.screenshot_history.recent_timestamps(),
+            float(current_time),
+            float(self.screenshot_burst_window_sec)
+        ))
         
-        if len(recent_screenshots) >= self.screenshot_burst_count:
-            return True, f"Screenshot burst: {len(recent_screenshots)} screenshots in {self.screenshot_burst_window_sec}s"
+        if recent_screenshots >= self.screenshot_burst_count:
+            return True, f"Screenshot burst: {recent_screenshots} screenshots in {self.screenshot_burst_window_sec}s"
         
         return False, ""
     
@@ -62,21 +106,23 @@ class RuleBasedDetector:
         if event.get("event_type") != "file_transfer":
             return False, ""
         
-        self.file_transfer_history.append(event)
         current_time = event.get("timestamp", time.time())
         size_mb = event.get("size_mb", 0)
+        self.file_transfer_history.append(current_time, size_mb)
         
         if size_mb > self.file_transfer_size_mb:
             return True, f"Large file transfer: {size_mb}MB > {self.file_transfer_size_mb}MB"
         
-        recent_transfers = [
-            e for e in self.file_transfer_history
-            if current_time - e.get("timestamp", 0) <= self.rapid_file_transfer_window_sec
-        ]
+        recent_transfers = int(burst_count(
+            self.file_transfer_history.recent_timestamps(),
+            float(current_time),
+            float(self.rapid_file_transfer_window_sec)
+        ))
         
-        if len(recent_transfers) >= self.rapid_file_transfer_count:
-            total_size = sum(e.get("size_mb", 0) for e in recent_transfers)
-            return True, f"Rapid file transfers: {len(recent_transfers)} files ({total_size:.1f}MB) in {self.rapid_file_transfer_window_sec}s"
+        if recent_transfers >= self.rapid_file_transfer_count:
+            mask = self.file_transfer_history.window_mask(current_time - self.rapid_file_transfer_window_sec)
+            total_size = float(self.file_transfer_history.sizes[:len(mask)][mask].sum())
+            return True, f"Rapid file transfers: {recent_transfers} files ({total_size:.1f}MB) in {self.rapid_file_transfer_window_sec}s"
         
         return False, ""
     
@@ -198,17 +244,28 @@ class DetectionEngine:
         """Get historical context for ML features"""
         one_minute_ago = current_time - 60
         
-        recent_events = [
-            e for e in self.history_window
-            if e.get("timestamp", 0) >= one_minute_ago
-        ]
+        # Single pass over the window
+        cb = ss = ft = 0
+        cb_kb = ft_mb = 0
+        for e in self.history_window:
+            if e.get("timestamp", 0) < one_minute_ago:
+                continue
+            event_type = e.get("event_type")
+            if event_type == "clipboard_copy":
+                cb += 1
+                cb_kb += e.get("size_kb", 0)
+            elif event_type == "screenshot":
+                ss += 1
+            elif event_type == "file_transfer":
+                ft += 1
+                ft_mb += e.get("size_mb", 0)
         
         return {
-            "clipboard_count_1min": sum(1 for e in recent_events if e.get("event_type") == "clipboard_copy"),
-            "screenshot_count_1min": sum(1 for e in recent_events if e.get("event_type") == "screenshot"),
-            "file_transfer_count_1min": sum(1 for e in recent_events if e.get("event_type") == "file_transfer"),
-            "clipboard_total_kb_1min": sum(e.get("size_kb", 0) for e in recent_events if e.get("event_type") == "clipboard_copy"),
-            "file_transfer_total_mb_1min": sum(e.get("size_mb", 0) for e in recent_events if e.get("event_type") == "file_transfer"),
+            "clipboard_count_1min": cb,
+            "screenshot_count_1min": ss,
+            "file_transfer_count_1min": ft,
+            "clipboard_total_kb_1min": cb_kb,
+            "file_transfer_total_mb_1min": ft_mb,
         }
     
     def evaluate(self, event: Dict) -> Dict:
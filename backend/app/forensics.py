@@ -3,11 +3,15 @@ Merkle tree & forensic bundle creation + verify functions
 """
 import hashlib
 import json
-from typing import List, Dict, Optional
+from functools import lru_cache
+from typing import List, Dict, Optional, Union
 from pathlib import Path
 from datetime import datetime
 import time
 
+# Bytes per Merkle proof level: 32-byte sibling digest + 1 direction byte
+PROOF_STEP_SIZE = 33
+
 
 class MerkleTree:
     """Merkle tree implementation for forensic anchoring"""
@@ -17,35 +21,64 @@ class MerkleTree:
         """Hash data using SHA-256"""
         return hashlib.sha256(data.encode('utf-8')).hexdigest()
     
+    @staticmethod
+    def _hash_pair(left, right) -> bytes:
+        """Hash two raw digests into their parent digest"""
+        # Feed both halves separately to avoid building a concatenated copy
+        h = hashlib.sha256(usedforsecurity=False)
+        h.update(left)
+        h.update(right)
+        return h.digest()
+    
+    @staticmethod
+    def _leaf_digest(item_hash: str) -> bytes:
+        """Return the raw 32-byte digest used for a leaf"""
+        # Hex SHA-256 digests decode directly, anything else is hashed once
+        if len(item_hash) == 64:
+            try:
+                return bytes.fromhex(item_hash)
+            except ValueError:
+                pass
+        return hashlib.sha256(item_hash.encode('utf-8')).digest()
+    
+    @staticmethod
+    def _build_levels(artifact_hashes: List[str]) -> List[List[bytes]]:
+        """Build all tree levels as raw digests, leaves first and root last"""
+        level = [MerkleTree._leaf_digest(h) for h in artifact_hashes]
+        levels = []
+        
+        while True:
+            # Odd levels duplicate their last node
+            if len(level) % 2 == 1:
+                level.append(level[-1])
+            levels.append(level)
+            level = [
+                MerkleTree._hash_pair(level[i], level[i + 1])
+                for i in range(0, len(level), 2)
+            ]
+            if len(level) == 1:
+                break
+        
+        levels.append(level)
+        return levels
+    
     @staticmethod
     def build_tree(hashes: List[str]) -> Dict:
         """Build Merkle tree from list of hashes"""
         if not hashes:
             return {"root": "", "tree": {}}
         
-        # Ensure even number of leaves
-        if len(hashes) % 2 == 1:
-            hashes.append(hashes[-1])
+        levels = MerkleTree._build_levels(hashes)
         
-        tree = {"leaves": hashes.copy()}
-        current_level = hashes
+        leaves = list(hashes)
+        if len(leaves) % 2 == 1:
+            leaves.append(leaves[-1])
+        tree = {"leaves": leaves}
         
-        level = 0
-        while len(current_level) > 1:
-            next_level = []
-            for i in range(0, len(current_level), 2):
-                left = current_level[i]
-                right = current_level[i + 1] if i + 1 < len(current_level) else current_level[i]
-                combined = left + right
-                parent_hash = MerkleTree.hash_data(combined)
-                next_level.append(parent_hash)
-            
-            tree[f"level_{level}"] = next_level
-            current_level = next_level
-            level += 1
+        for level, nodes in enumerate(levels[1:]):
+            tree[f"level_{level}"] = [node.hex() for node in nodes]
         
-        root_hash = current_level[0] if current_level else ""
-        tree["root"] = root_hash
+        tree["root"] = levels[-1][0].hex()
         
         return tree
     
@@ -59,36 +92,33 @@ class MerkleTree:
         return tree["root"]
     
     @staticmethod
-    def generate_proof(artifact_hashes: List[str], item_hash: str) -> List[str]:
-        """Generate Merkle proof for an item"""
-        # Simplified proof generation
-        # In production, this would generate the actual path to root
-        proof = []
-        current_level = artifact_hashes.copy()
+    def generate_proof(artifact_hashes: List[str], item_hash: str) -> bytes:
+        """
+        Generate Merkle proof for an item.
         
-        if item_hash not in current_level:
-            return []
+        The proof is a flat blob of PROOF_STEP_SIZE bytes per level: the
+        32-byte sibling digest followed by one direction byte (1 when the
+        sibling sits on the left).
+        """
+        if item_hash not in artifact_hashes:
+            return b""
         
-        idx = current_level.index(item_hash)
+        idx = artifact_hashes.index(item_hash)
+        levels = MerkleTree._build_levels(artifact_hashes)
         
-        while len(current_level) > 1:
-            sibling_idx = idx ^ 1  # XOR to get sibling
-            if sibling_idx < len(current_level):
-                proof.append(current_level[sibling_idx])
-            
-            # Move to parent level
-            next_level = []
-            for i in range(0, len(current_level), 2):
-                left = current_level[i]
-                right = current_level[i + 1] if i + 1 < len(current_level) else current_level[i]
-                combined = left + right
-                parent_hash = MerkleTree.hash_data(combined)
-                next_level.append(parent_hash)
-            
-            current_level = next_level
-            idx = idx // 2
+        proof = bytearray()
+        for level in levels[:-1]:
+            proof += level[idx ^ 1]
+            proof.append(idx & 1)
+            idx //= 2
         
-        return proof
+        return bytes(proof)
+
+
+@lru_cache(maxsize=4096)
+def _stub_tx_hash(merkle_root: str) -> str:
+    """Derive the stub transaction hash deterministically from the root"""
+    return hashlib.blake2b(merkle_root.encode(), digest_size=32).hexdigest()
 
 
 def sign_stub(merkle_root: str) -> Dict:
@@ -97,24 +127,52 @@ def sign_stub(merkle_root: str) -> Dict:
     Returns fake transaction ID for demonstration.
     """
     # In production, this would interact with a real blockchain
-    # For now, generate a fake transaction hash
-    fake_tx_data = f"{merkle_root}_{time.time()}"
-    fake_tx_hash = hashlib.sha256(fake_tx_data.encode()).hexdigest()
-    
+    # For now, derive a fake transaction hash from the root, so re-signing
+    # the same root is a cache hit and yields the same tx hash
     return {
-        "tx_hash": fake_tx_hash,
+        "tx_hash": _stub_tx_hash(merkle_root),
         "blockchain": "stub",
         "timestamp": time.time(),
         "signed": True
     }
 
 
-def verify_proof(root: str, proof: List[str], item_hash: str) -> bool:
-    """Verify Merkle proof"""
+def verify_proof(root: str, proof: Union[bytes, str, List[str]], item_hash: str) -> bool:
+    """
+    Verify Merkle proof.
+    
+    Accepts the flat proof blob from MerkleTree.generate_proof, its hex
+    encoding as stored in forensic bundles, or a legacy list of sibling hashes.
+    """
+    if isinstance(proof, list):
+        return _verify_legacy_proof(root, proof, item_hash)
+    
+    if isinstance(proof, str):
+        try:
+            proof = bytes.fromhex(proof)
+        except ValueError:
+            return False
+    
+    if len(proof) % PROOF_STEP_SIZE:
+        return False
+    
+    proof = memoryview(proof)
+    current = MerkleTree._leaf_digest(item_hash)
+    for i in range(0, len(proof), PROOF_STEP_SIZE):
+        sibling = proof[i:i + 32]
+        if proof[i + 32]:
+            current = MerkleTree._hash_pair(sibling, current)
+        else:
+            current = MerkleTree._hash_pair(current, sibling)
+    
+    return current.hex() == root
+
+
+def _verify_legacy_proof(root: str, proof: List[str], item_hash: str) -> bool:
+    """Verify a list-of-hex proof produced before proofs carried directions"""
     current_hash = item_hash
     
     for sibling_hash in proof:
-        # Determine order (simplified - in production would track left/right)
         combined = current_hash + sibling_hash
         current_hash = MerkleTree.hash_data(combined)
     
@@ -149,7 +207,7 @@ def create_forensic_bundle(alert_data: Dict, artifacts: List[Dict]) -> Dict:
     for art in artifacts:
         if art.get("hash"):
             proof = MerkleTree.generate_proof(artifact_hashes, art["hash"])
-            proofs[art["hash"]] = proof
+            proofs[art["hash"]] = proof.hex()
     
     # Sign the root (stub)
     signature = sign_stub(merkle_root)
@@ -160,17 +160,28 @@ class EnhancedDetectionService:
         """Get historical context for ML features"""
         one_minute_ago = current_time - 60
         
-        recent_events = [
-            e for e in self.history_window
-            if e.get("timestamp", 0) >= one_minute_ago
-        ]
+        # Single pass over the window
+        cb = ss = ft = 0
+        cb_kb = ft_mb = 0
+        for e in self.history_window:
+            if e.get("timestamp", 0) < one_minute_ago:
+                continue
+            event_type = e.get("event_type")
+            if event_type == "clipboard_copy":
+                cb += 1
+                cb_kb += e.get("size_kb", 0)
+            elif event_type == "screenshot":
+                ss += 1
+            elif event_type == "file_transfer":
+                ft += 1
+                ft_mb += e.get("size_mb", 0)
         
         context = {
-            "clipboard_count_1min": sum(1 for e in recent_events if e.get("event_type") == "clipboard_copy"),
-            "screenshot_count_1min": sum(1 for e in recent_events if e.get("event_type") == "screenshot"),
-            "file_transfer_count_1min": sum(1 for e in recent_events if e.get("event_type") == "file_transfer"),
-            "clipboard_total_kb_1min": sum(e.get("size_kb", 0) for e in recent_events if e.get("event_type") == "clipboard_copy"),
-            "file_transfer_total_mb_1min": sum(e.get("size_mb", 0) for e in recent_events if e.get("event_type") == "file_transfer"),
+            "clipboard_count_1min": cb,
+            "screenshot_count_1min": ss,
+            "file_transfer_count_1min": ft,
+            "clipboard_total_kb_1min": cb_kb,
+            "file_transfer_total_mb_1min": ft_mb,
         }
         
         return context
@@ -2,7 +2,7 @@
 Tests for detection engine
 """
 import pytest
-from backend.app.detector import RuleBasedDetector, MLDetectorStub, DetectionEngine
+from backend.app.detector import RuleBasedDetector, MLDetectorStub, DetectionEngine, EventHistory
 
 
 def test_clipboard_rule():
@@ -78,6 +78,34 @@ def test_file_transfer_rule():
     assert "Large file transfer" in reason
 
 
+def test_rapid_file_transfer_rule():
+    """Test rapid file transfers within the window trigger"""
+    detector = RuleBasedDetector()
+    
+    for i in range(2):
+        event = {
+            "event_type": "file_transfer",
+            "size_mb": 30,
+            "timestamp": 1000.0 + i * 5.0
+        }
+        triggered, reason = detector.check_file_transfer_rule(event)
+    
+    assert triggered
+    assert "2 files (60.0MB)" in reason
+
+
+def test_event_history_wraps():
+    """Test event history keeps only the most recent events"""
+    history = EventHistory(capacity=4)
+    for i in range(6):
+        history.append(1000.0 + i, float(i))
+    
+    assert len(history) == 4
+    assert int(history.window_mask(1000.0).sum()) == 4
+    assert int(history.window_mask(1004.0).sum()) == 2
+    assert float(history.sizes.sum()) == 2.0 + 3.0 + 4.0 + 5.0
+
+
 def test_ml_detector_stub():
     """Test ML detector stub"""
     detector = MLDetectorStub()
@@ -121,3 +149,23 @@ def test_detection_engine():
     if result["is_alert"]:
         assert "rule_based" in result["detection_methods"] or "ml_based" in result["detection_methods"]
 
+
+
+def test_history_context():
+    """Test one-minute history context counts and totals"""
+    engine = DetectionEngine()
+    engine.history_window.extend([
+        {"event_type": "clipboard_copy", "size_kb": 100, "timestamp": 900.0},  # Outside window
+        {"event_type": "clipboard_copy", "size_kb": 50, "timestamp": 950.0},
+        {"event_type": "screenshot", "timestamp": 960.0},
+        {"event_type": "file_transfer", "size_mb": 12.5, "timestamp": 970.0},
+    ])
+    
+    context = engine.get_history_context(1000.0)
+    assert context == {
+        "clipboard_count_1min": 1,
+        "screenshot_count_1min": 1,
+        "file_transfer_count_1min": 1,
+        "clipboard_total_kb_1min": 50,
+        "file_transfer_total_mb_1min": 12.5,
+    }
@@ -41,6 +41,10 @@ def test_sign_stub():
     assert "tx_hash" in signature
     assert "blockchain" in signature
     assert signature["signed"] is True
+    
+    # Re-signing the same root yields the same transaction hash
+    assert sign_stub(merkle_root)["tx_hash"] == signature["tx_hash"]
+    assert sign_stub("other_root")["tx_hash"] != signature["tx_hash"]
 
 
 def test_create_forensic_bundle():
@@ -95,3 +99,18 @@ def test_verify_proof():
     verified = verify_proof(root, proof, "hash1")
     assert verified is True
 
+
+
+def test_verify_proof_all_leaves():
+    """Test Merkle proofs verify for every leaf, including odd trees"""
+    hashes = ["hash1", "hash2", "hash3", "hash4", "hash5"]
+    root = MerkleTree.create_merkle_root(hashes)
+    
+    for item_hash in hashes:
+        proof = MerkleTree.generate_proof(hashes, item_hash)
+        assert len(proof) == 33 * 3
+        assert verify_proof(root, proof, item_hash) is True
+        assert verify_proof(root, proof.hex(), item_hash) is True
+    
+    proof = MerkleTree.generate_proof(hashes, "hash2")
+    assert verify_proof(root, proof, "hash3") is False
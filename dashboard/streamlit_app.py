@@ -12,6 +12,7 @@ from typing import List, Dict
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
+import numpy as np
 
 # Page config
 st.set_page_config(
@@ -44,6 +45,19 @@ def fetch_alerts(api_url: str) -> List[Dict]:
         return []
 
 
+def _top_k_recent(alerts: List[Dict], k: int = 20) -> List[Dict]:
+    """Return the k most recent alerts, newest first"""
+    if len(alerts) <= 64:
+        return sorted(alerts, key=lambda x: x.get("timestamp", ""), reverse=True)[:k]
+    
+    # ISO-8601 timestamps from the API order correctly as strings, so a
+    # partial sort over the array only fully sorts the top k
+    timestamps = np.array([a.get("timestamp", "") for a in alerts])
+    idx = np.argpartition(timestamps, len(alerts) - k)[-k:]
+    idx = idx[np.argsort(timestamps[idx])[::-1]]
+    return [alerts[i] for i in idx]
+
+
 def contain_session(api_url: str, session_id: str) -> bool:
     """Send containment request to backend"""
     try:
@@ -97,7 +111,7 @@ def main():
             st.info("No alerts detected yet. Run the attack simulator to generate events.")
         else:
             # Recent alerts
-            recent_alerts = sorted(alerts, key=lambda x: x.get("timestamp", ""), reverse=True)[:20]
+            recent_alerts = _top_k_recent(alerts, k=20)
             
             for alert in recent_alerts:
                 severity = alert.get("severity", "medium")
@@ -197,13 +211,9 @@ def main():
             if "datetime" in df.columns:
                 df["date"] = df["datetime"].dt.date
                 timeline = df.groupby("date").size().reset_index(name="count")
-                fig = px.line(
-                    timeline,
-                    x="date",
-                    y="count",
-                    title="Alerts Timeline"
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                # Arrow-backed chart: ships only the column buffers, not a Plotly spec
+                st.subheader("Alerts Timeline")
+                st.line_chart(timeline.set_index("date")["count"])
     
     with tab3:
         st.header("🔍 Forensic Data")
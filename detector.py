@@ -5,40 +5,144 @@ Hybrid rule-based + ML detection engine for VNC data exfiltration.
 Generates alerts with explainable reasons and forensic JSON.
 """
 
-import json
+import functools
+import hashlib
+import os
 import time
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
-from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
 import numpy as np
 import pandas as pd
 from collections import deque
 import joblib
+import orjson
+from merkle_anchor import iso_timestamp
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+
+EVENT_TYPE_CODES = {"clipboard_copy": 0, "screenshot": 1, "file_transfer": 2}
+OTHER_EVENT_CODE = 3
+
+
+def _event_time(event: Dict) -> float:
+    """Event timestamp, reading the clock only when the event carries none."""
+    timestamp = event.get("timestamp")
+    return time.time() if timestamp is None else timestamp
+
+
+def _fill_feature_row(out, etype, size_kb, size_mb, ts, clipboard_count, screenshot_count,
+                      file_transfer_count, clipboard_total_kb, file_transfer_total_mb):
+    """Write the 11 model features for one event into out."""
+    # Event type encoding
+    out[0] = 1.0 if etype == 0 else 0.0
+    out[1] = 1.0 if etype == 1 else 0.0
+    out[2] = 1.0 if etype == 2 else 0.0
+    
+    # Size features
+    out[3] = size_kb / 1000.0 if etype == 0 else 0.0  # Clipboard size, normalized to MB
+    out[4] = size_mb if etype == 2 else 0.0  # File size
+    
+    # Temporal features
+    out[5] = ts % 86400.0 / 86400.0  # Time of day (normalized)
+    
+    # History-based features
+    out[6] = clipboard_count / 10.0  # Normalize
+    out[7] = screenshot_count / 10.0
+    out[8] = file_transfer_count / 10.0
+    
+    # Rate features
+    out[9] = clipboard_total_kb / 1000.0
+    out[10] = file_transfer_total_mb
+
+
+try:
+    from numba import njit
+    _fill_feature_row = njit(cache=True)(_fill_feature_row)
+except ImportError:
+    pass
+
+
+@functools.lru_cache(maxsize=4)
+def _load_model_bundle(path: str, mtime_ns: int) -> Dict:
+    """Load a joblib model bundle once per (path, mtime); a retrain changes the key."""
+    return joblib.load(path)
+
+
+class EventWindow:
+    """Fixed-size ring of recent events stored as parallel NumPy columns."""
+    
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.timestamps = np.full(capacity, -np.inf, dtype=np.float64)
+        self.event_types = np.full(capacity, OTHER_EVENT_CODE, dtype=np.uint8)
+        self.sizes_kb = np.zeros(capacity, dtype=np.float32)
+        self.sizes_mb = np.zeros(capacity, dtype=np.float32)
+        self._head = 0
+    
+    def __len__(self) -> int:
+        return min(self._head, self.capacity)
+    
+    def append(self, event: Dict):
+        """Write an event into the next ring slot, overwriting the oldest."""
+        idx = self._head % self.capacity
+        self.timestamps[idx] = event.get("timestamp", 0)
+        self.event_types[idx] = EVENT_TYPE_CODES.get(event.get("event_type"), OTHER_EVENT_CODE)
+        self.sizes_kb[idx] = event.get("size_kb", 0)
+        self.sizes_mb[idx] = event.get("size_mb", 0)
+        self._head += 1
 
 
 class RuleBasedDetector:
     """Rule-based detection engine with 3 core rules."""
     
+    __slots__ = ("clipboard_history", "screenshot_history", "file_transfer_history", "_file_transfer_window_mb")
+    
+    # Rule thresholds
+    CLIPBOARD_SIZE_THRESHOLD_KB = 200  # Alert if clipboard > 200KB
+    SCREENSHOT_BURST_COUNT = 5  # Alert if 5+ screenshots in short time
+    SCREENSHOT_BURST_WINDOW_SEC = 10  # Within 10 seconds
+    FILE_TRANSFER_SIZE_THRESHOLD_MB = 50  # Alert if file > 50MB
+    RAPID_FILE_TRANSFER_COUNT = 2  # Alert if 2+ large files in short time
+    RAPID_FILE_TRANSFER_WINDOW_SEC = 30  # Within 30 seconds
+    
     def __init__(self):
+        # Rule history holds primitives only: (timestamp, size_kb) copies,
+        # screenshot timestamps and (timestamp, size_mb) transfers
         self.clipboard_history = deque(maxlen=100)
         self.screenshot_history = deque(maxlen=100)
         self.file_transfer_history = deque(maxlen=100)
-        
-        # Rule thresholds
-        self.CLIPBOARD_SIZE_THRESHOLD_KB = 200  # Alert if clipboard > 200KB
-        self.SCREENSHOT_BURST_COUNT = 5  # Alert if 5+ screenshots in short time
-        self.SCREENSHOT_BURST_WINDOW_SEC = 10  # Within 10 seconds
-        self.FILE_TRANSFER_SIZE_THRESHOLD_MB = 50  # Alert if file > 50MB
-        self.RAPID_FILE_TRANSFER_COUNT = 2  # Alert if 2+ large files in short time
-        self.RAPID_FILE_TRANSFER_WINDOW_SEC = 30  # Within 30 seconds
+        self._file_transfer_window_mb = 0.0
+    
+    @staticmethod
+    def _unpack(event: Dict) -> Tuple[Optional[str], float, float, float]:
+        """Pull (event_type, timestamp, size_kb, size_mb) out of an event once."""
+        return event.get("event_type"), _event_time(event), event.get("size_kb", 0), event.get("size_mb", 0)
     
     def check_clipboard_size_rule(self, event: Dict) -> Tuple[bool, str]:
         """Rule 1: Detect large clipboard operations."""
-        if event.get("event_type") != "clipboard_copy":
+        event_type, timestamp, size_kb, _ = self._unpack(event)
+        return self._clipboard_size_rule(event_type, timestamp, size_kb)
+    
+    def check_screenshot_burst_rule(self, event: Dict) -> Tuple[bool, str]:
+        """Rule 2: Detect screenshot scraping (burst pattern)."""
+        event_type, timestamp, _, _ = self._unpack(event)
+        return self._screenshot_burst_rule(event_type, timestamp)
+    
+    def check_file_transfer_rule(self, event: Dict) -> Tuple[bool, str]:
+        """Rule 3: Detect rapid large file transfers."""
+        event_type, timestamp, _, size_mb = self._unpack(event)
+        return self._file_transfer_rule(event_type, timestamp, size_mb)
+    
+    def _clipboard_size_rule(self, event_type: Optional[str], current_time: float, size_kb: float) -> Tuple[bool, str]:
+        """Rule 1 on pre-extracted event fields."""
+        if event_type != "clipboard_copy":
             return False, ""
         
-        size_kb = event.get("size_kb", 0)
-        self.clipboard_history.append(event)
+        self.clipboard_history.append((current_time, size_kb))
         
         if size_kb > self.CLIPBOARD_SIZE_THRESHOLD_KB:
             reason = f"Clipboard copy exceeds threshold: {size_kb}KB > {self.CLIPBOARD_SIZE_THRESHOLD_KB}KB"
@@ -46,34 +150,39 @@ class RuleBasedDetector:
         
         return False, ""
     
-    def check_screenshot_burst_rule(self, event: Dict) -> Tuple[bool, str]:
-        """Rule 2: Detect screenshot scraping (burst pattern)."""
-        if event.get("event_type") != "screenshot":
+    def _screenshot_burst_rule(self, event_type: Optional[str], current_time: float) -> Tuple[bool, str]:
+        """Rule 2 on pre-extracted event fields."""
+        if event_type != "screenshot":
             return False, ""
         
-        self.screenshot_history.append(event)
-        current_time = event.get("timestamp", time.time())
+        # Slide the burst window: drop screenshots that fell out of it
+        history = self.screenshot_history
+        cutoff = current_time - self.SCREENSHOT_BURST_WINDOW_SEC
+        while history and history[0] < cutoff:
+            history.popleft()
+        history.append(current_time)
         
-        # Count screenshots in the burst window
-        recent_screenshots = [
-            e for e in self.screenshot_history
-            if current_time - e.get("timestamp", 0) <= self.SCREENSHOT_BURST_WINDOW_SEC
-        ]
-        
-        if len(recent_screenshots) >= self.SCREENSHOT_BURST_COUNT:
-            reason = f"Screenshot burst detected: {len(recent_screenshots)} screenshots in {self.SCREENSHOT_BURST_WINDOW_SEC} seconds"
+        recent_count = len(history)
+        if recent_count >= self.SCREENSHOT_BURST_COUNT:
+            reason = f"Screenshot burst detected: {recent_count} screenshots in {self.SCREENSHOT_BURST_WINDOW_SEC} seconds"
             return True, reason
         
         return False, ""
     
-    def check_file_transfer_rule(self, event: Dict) -> Tuple[bool, str]:
-        """Rule 3: Detect rapid large file transfers."""
-        if event.get("event_type") != "file_transfer":
+    def _file_transfer_rule(self, event_type: Optional[str], current_time: float, size_mb: float) -> Tuple[bool, str]:
+        """Rule 3 on pre-extracted event fields."""
+        if event_type != "file_transfer":
             return False, ""
         
-        self.file_transfer_history.append(event)
-        current_time = event.get("timestamp", time.time())
-        size_mb = event.get("size_mb", 0)
+        # Slide the transfer window, keeping the running size total in step
+        history = self.file_transfer_history
+        cutoff = current_time - self.RAPID_FILE_TRANSFER_WINDOW_SEC
+        while history and history[0][0] < cutoff:
+            self._file_transfer_window_mb -= history.popleft()[1]
+        if len(history) == history.maxlen:
+            self._file_transfer_window_mb -= history[0][1]
+        history.append((current_time, size_mb))
+        self._file_transfer_window_mb += size_mb
         
         # Check single large file
         if size_mb > self.FILE_TRANSFER_SIZE_THRESHOLD_MB:
@@ -81,35 +190,85 @@ class RuleBasedDetector:
             return True, reason
         
         # Check rapid multiple transfers
-        recent_transfers = [
-            e for e in self.file_transfer_history
-            if current_time - e.get("timestamp", 0) <= self.RAPID_FILE_TRANSFER_WINDOW_SEC
-        ]
-        
-        if len(recent_transfers) >= self.RAPID_FILE_TRANSFER_COUNT:
-            total_size = sum(e.get("size_mb", 0) for e in recent_transfers)
-            reason = f"Rapid file transfer detected: {len(recent_transfers)} files ({total_size:.1f}MB total) in {self.RAPID_FILE_TRANSFER_WINDOW_SEC} seconds"
+        recent_count = len(history)
+        if recent_count >= self.RAPID_FILE_TRANSFER_COUNT:
+            total_size = self._file_transfer_window_mb
+            reason = f"Rapid file transfer detected: {recent_count} files ({total_size:.1f}MB total) in {self.RAPID_FILE_TRANSFER_WINDOW_SEC} seconds"
             return True, reason
         
         return False, ""
     
     def evaluate_rules(self, event: Dict) -> Tuple[bool, List[str]]:
         """Evaluate all rules and return (is_alert, reasons)."""
+        event_type, timestamp, size_kb, size_mb = self._unpack(event)
         reasons = []
         
-        triggered, reason = self.check_clipboard_size_rule(event)
+        triggered, reason = self._clipboard_size_rule(event_type, timestamp, size_kb)
         if triggered:
             reasons.append(f"Rule 1: {reason}")
         
-        triggered, reason = self.check_screenshot_burst_rule(event)
+        triggered, reason = self._screenshot_burst_rule(event_type, timestamp)
         if triggered:
             reasons.append(f"Rule 2: {reason}")
         
-        triggered, reason = self.check_file_transfer_rule(event)
+        triggered, reason = self._file_transfer_rule(event_type, timestamp, size_mb)
         if triggered:
             reasons.append(f"Rule 3: {reason}")
         
         return len(reasons) > 0, reasons
+    
+    @staticmethod
+    def _window_stats(ts: np.ndarray, window: float) -> Tuple[np.ndarray, np.ndarray]:
+        """For time-sorted ts, return each event's window start index and count in [t - window, t]."""
+        start = np.searchsorted(ts, ts - window, side="left")
+        return start, np.arange(1, len(ts) + 1) - start
+    
+    def evaluate_batch(self, events_df: pd.DataFrame) -> pd.DataFrame:
+        """Evaluate all rules over a replay DataFrame; one row per (alert_idx, rule_id, reason)."""
+        rows = []
+        n = len(events_df)
+        if n == 0:
+            return pd.DataFrame(rows, columns=["alert_idx", "rule_id", "reason"])
+        
+        timestamps = events_df["timestamp"]
+        if pd.api.types.is_datetime64_any_dtype(timestamps):
+            ts = timestamps.to_numpy(dtype="datetime64[ns]").astype(np.int64) / 1e9
+        else:
+            ts = timestamps.to_numpy(dtype=np.float64)
+        event_type = events_df["event_type"].astype(str).to_numpy()
+        size_kb = events_df["size_kb"].fillna(0).to_numpy() if "size_kb" in events_df else np.zeros(n)
+        size_mb = events_df["size_mb"].fillna(0).to_numpy() if "size_mb" in events_df else np.zeros(n)
+        labels = events_df.index
+        
+        # Rule 1: large clipboard copies
+        for i in np.flatnonzero((event_type == "clipboard_copy") & (size_kb > self.CLIPBOARD_SIZE_THRESHOLD_KB)):
+            rows.append((labels[i], 1, f"Clipboard copy exceeds threshold: {size_kb[i]}KB > {self.CLIPBOARD_SIZE_THRESHOLD_KB}KB"))
+        
+        # Rule 2: screenshot bursts, counted over time-sorted screenshots
+        order = np.flatnonzero(event_type == "screenshot")
+        order = order[np.argsort(ts[order], kind="stable")]
+        _, counts = self._window_stats(ts[order], self.SCREENSHOT_BURST_WINDOW_SEC)
+        for i, count in zip(order[counts >= self.SCREENSHOT_BURST_COUNT], counts[counts >= self.SCREENSHOT_BURST_COUNT]):
+            rows.append((labels[i], 2, f"Screenshot burst detected: {count} screenshots in {self.SCREENSHOT_BURST_WINDOW_SEC} seconds"))
+        
+        # Rule 3: single large transfers, else rapid transfers with a windowed size total
+        order = np.flatnonzero(event_type == "file_transfer")
+        order = order[np.argsort(ts[order], kind="stable")]
+        start, counts = self._window_stats(ts[order], self.RAPID_FILE_TRANSFER_WINDOW_SEC)
+        sizes = size_mb[order]
+        totals = np.concatenate(([0.0], np.cumsum(sizes)))
+        totals = totals[1:] - totals[start]
+        large = sizes > self.FILE_TRANSFER_SIZE_THRESHOLD_MB
+        rapid = ~large & (counts >= self.RAPID_FILE_TRANSFER_COUNT)
+        for j in np.flatnonzero(large | rapid):
+            if large[j]:
+                reason = f"Large file transfer detected: {sizes[j]}MB > {self.FILE_TRANSFER_SIZE_THRESHOLD_MB}MB"
+            else:
+                reason = f"Rapid file transfer detected: {counts[j]} files ({totals[j]:.1f}MB total) in {self.RAPID_FILE_TRANSFER_WINDOW_SEC} seconds"
+            rows.append((labels[order[j]], 3, reason))
+        
+        alerts = pd.DataFrame(rows, columns=["alert_idx", "rule_id", "reason"])
+        return alerts.sort_values(["alert_idx", "rule_id"], kind="stable", ignore_index=True)
 
 
 class MLDetector:
@@ -119,15 +278,23 @@ class MLDetector:
         self.model_path = Path(model_path)
         self.model = None
         self.feature_names = None
+        self.feature_importance = {}
+        self.onnx_session = None
+        self.onnx_input_name = None
+        # Reused for single-event feature rows to avoid an allocation per event
+        self._feature_buf = np.empty((1, self.N_FEATURES), dtype=np.float32)
         self.load_model()
     
     def load_model(self):
         """Load trained ML model."""
         if self.model_path.exists():
             try:
-                model_data = joblib.load(self.model_path)
+                model_data = _load_model_bundle(str(self.model_path), self.model_path.stat().st_mtime_ns)
                 self.model = model_data.get("model")
                 self.feature_names = model_data.get("feature_names", [])
+                # Scoring batches are tiny, so a joblib worker pool per call costs more than the trees
+                if hasattr(self.model, "n_jobs"):
+                    self.model.n_jobs = 1
                 print(f"[MLDetector] Loaded model from {self.model_path}")
             except Exception as e:
                 print(f"[MLDetector] Warning: Could not load model: {e}")
@@ -135,121 +302,153 @@ class MLDetector:
         else:
             print(f"[MLDetector] Warning: Model not found at {self.model_path}")
             self.model = None
-    
-    def extract_features(self, event: Dict, history_context: Dict) -> np.ndarray:
-        """Extract features from event for ML model."""
-        features = []
-        
-        # Event type encoding
-        event_type = event.get("event_type", "unknown")
-        features.append(1.0 if event_type == "clipboard_copy" else 0.0)
-        features.append(1.0 if event_type == "screenshot" else 0.0)
-        features.append(1.0 if event_type == "file_transfer" else 0.0)
-        
-        # Size features
-        if event_type == "clipboard_copy":
-            features.append(event.get("size_kb", 0) / 1000.0)  # Normalize to MB
-            features.append(0.0)  # file size
-        elif event_type == "file_transfer":
-            features.append(0.0)  # clipboard size
-            features.append(event.get("size_mb", 0))
-        else:
-            features.append(0.0)
-            features.append(0.0)
-        
-        # Temporal features
-        current_time = event.get("timestamp", time.time())
-        features.append(current_time % 86400 / 86400.0)  # Time of day (normalized)
         
-        # History-based features
-        clipboard_count = history_context.get("clipboard_count_1min", 0)
-        screenshot_count = history_context.get("screenshot_count_1min", 0)
-        file_transfer_count = history_context.get("file_transfer_count_1min", 0)
+        # Importances are fixed once the model is loaded (simplified - in production use SHAP)
+        self.feature_importance = {}
+        if hasattr(self.model, 'feature_importances_'):
+            importances = self.model.feature_importances_
+            feature_names = self.feature_names or [f"feature_{i}" for i in range(len(importances))]
+            self.feature_importance = {name: float(imp) for name, imp in zip(feature_names, importances)}
         
-        features.append(clipboard_count / 10.0)  # Normalize
-        features.append(screenshot_count / 10.0)
-        features.append(file_transfer_count / 10.0)
-        
-        # Rate features
-        features.append(history_context.get("clipboard_total_kb_1min", 0) / 1000.0)
-        features.append(history_context.get("file_transfer_total_mb_1min", 0))
+        self._load_onnx()
+    
+    def _load_onnx(self):
+        """Use an ONNX export of the model for scoring when one is present and current."""
+        self.onnx_session = None
+        self.onnx_input_name = None
+        onnx_path = self.model_path.with_suffix(".onnx")
+        if ort is None or self.model is None or not onnx_path.exists():
+            return
+        if onnx_path.stat().st_mtime < self.model_path.stat().st_mtime:
+            print(f"[MLDetector] Ignoring stale ONNX model at {onnx_path}")
+            return
         
-        return np.array(features).reshape(1, -1)
+        try:
+            options = ort.SessionOptions()
+            options.intra_op_num_threads = 1
+            self.onnx_session = ort.InferenceSession(str(onnx_path), options, providers=["CPUExecutionProvider"])
+            self.onnx_input_name = self.onnx_session.get_inputs()[0].name
+            print(f"[MLDetector] Scoring with ONNX model from {onnx_path}")
+        except Exception as e:
+            print(f"[MLDetector] Warning: Could not load ONNX model: {e}")
+            self.onnx_session = None
+    
+    N_FEATURES = 11
+    
+    def _fill_features(self, row: np.ndarray, event: Dict, history_context: Dict):
+        """Write the feature vector for one event into a preallocated row."""
+        _fill_feature_row(
+            row,
+            EVENT_TYPE_CODES.get(event.get("event_type", "unknown"), OTHER_EVENT_CODE),
+            float(event.get("size_kb", 0)),
+            float(event.get("size_mb", 0)),
+            float(_event_time(event)),
+            float(history_context.get("clipboard_count_1min", 0)),
+            float(history_context.get("screenshot_count_1min", 0)),
+            float(history_context.get("file_transfer_count_1min", 0)),
+            float(history_context.get("clipboard_total_kb_1min", 0)),
+            float(history_context.get("file_transfer_total_mb_1min", 0))
+        )
+    
+    def extract_features(self, event: Dict, history_context: Dict) -> np.ndarray:
+        """Extract features from event for ML model."""
+        self._fill_features(self._feature_buf[0], event, history_context)
+        return self._feature_buf.copy()
     
     def predict(self, event: Dict, history_context: Dict) -> Tuple[float, Dict]:
         """Predict anomaly score and return explainability info."""
+        scores, infos = self.predict_batch([event], [history_context])
+        return float(scores[0]), infos[0]
+    
+    def predict_batch(self, events: List[Dict], history_contexts: List[Dict]) -> Tuple[np.ndarray, List[Dict]]:
+        """Score a batch of events with a single predict_proba call."""
+        n = len(events)
         if self.model is None:
-            return 0.0, {"error": "Model not loaded"}
+            return np.zeros(n), [{"error": "Model not loaded"} for _ in range(n)]
         
         try:
-            features = self.extract_features(event, history_context)
-            score = self.model.predict_proba(features)[0][1]  # Probability of anomaly
-            
-            # Feature importance (simplified - in production use SHAP)
-            feature_importance = {}
-            if hasattr(self.model, 'feature_importances_'):
-                importances = self.model.feature_importances_
-                feature_names = self.feature_names or [f"feature_{i}" for i in range(len(importances))]
-                for name, imp in zip(feature_names, importances):
-                    feature_importance[name] = float(imp)
+            X = self._feature_buf if n == 1 else np.empty((n, self.N_FEATURES), dtype=np.float32)
+            for row, event, history_context in zip(X, events, history_contexts):
+                self._fill_features(row, event, history_context)
+            if self.onnx_session is not None:
+                # Outputs are (labels, probabilities) when exported without zipmap
+                scores = self.onnx_session.run(None, {self.onnx_input_name: X})[1][:, 1]
+            else:
+                scores = self.model.predict_proba(X)[:, 1]  # Probability of anomaly
             
-            return float(score), {
-                "anomaly_score": float(score),
-                "feature_importance": feature_importance,
-                "threshold": 0.5
-            }
+            # Alerts share the cached importance dict; treat it as read-only
+            infos = [
+                {
+                    "anomaly_score": float(score),
+                    "feature_importance": self.feature_importance,
+                    "threshold": 0.5
+                }
+                for score in scores
+            ]
+            return scores, infos
         except Exception as e:
             print(f"[MLDetector] Prediction error: {e}")
-            return 0.0, {"error": str(e)}
+            return np.zeros(n), [{"error": str(e)} for _ in range(n)]
 
 
 class HybridDetector:
     """Combines rule-based and ML detection."""
     
     def __init__(self, events_file: str = "data/synthetic/vnc_events.jsonl",
-                 model_path: str = "models/detection_model.pkl"):
+                 model_path: str = "models/detection_model.pkl",
+                 fast_path_on_rule_alert: bool = False):
         self.rule_detector = RuleBasedDetector()
         self.ml_detector = MLDetector(model_path)
+        # Skip ML scoring for events a rule already flagged (their severity stays "medium")
+        self.fast_path_on_rule_alert = fast_path_on_rule_alert
         self.events_file = Path(events_file)
         self.alerts_file = Path("logs/alerts.jsonl")
         self.forensic_dir = Path("forensic")
         self.forensic_dir.mkdir(parents=True, exist_ok=True)
         self.alerts_file.parent.mkdir(parents=True, exist_ok=True)
         
-        # Track processed events
-        self.processed_lines = set()
-        self.history_window = deque(maxlen=1000)  # Last 1000 events for context
+        # Tail position in the events file; a trailing partial line waits for the next poll
+        self._events_fh = None
+        self._last_offset = 0
+        self._partial = b""
+        self._alerts_fh = None
+        self._alerts_fh_path = None
+        self.history_window = EventWindow(capacity=1000)  # Last 1000 events for context
+        self._last_alert_ms = 0
     
     def get_history_context(self, current_time: float) -> Dict:
         """Get historical context for ML features."""
         one_minute_ago = current_time - 60
+        window = self.history_window
         
-        recent_events = [
-            e for e in self.history_window
-            if e.get("timestamp", 0) >= one_minute_ago
-        ]
+        mask = window.timestamps >= one_minute_ago
+        codes = window.event_types[mask]
+        counts = np.bincount(codes, minlength=OTHER_EVENT_CODE + 1)
         
         context = {
-            "clipboard_count_1min": sum(1 for e in recent_events if e.get("event_type") == "clipboard_copy"),
-            "screenshot_count_1min": sum(1 for e in recent_events if e.get("event_type") == "screenshot"),
-            "file_transfer_count_1min": sum(1 for e in recent_events if e.get("event_type") == "file_transfer"),
-            "clipboard_total_kb_1min": sum(e.get("size_kb", 0) for e in recent_events if e.get("event_type") == "clipboard_copy"),
-            "file_transfer_total_mb_1min": sum(e.get("size_mb", 0) for e in recent_events if e.get("event_type") == "file_transfer"),
+            "clipboard_count_1min": int(counts[0]),
+            "screenshot_count_1min": int(counts[1]),
+            "file_transfer_count_1min": int(counts[2]),
+            "clipboard_total_kb_1min": float(window.sizes_kb[mask][codes == 0].sum()),
+            "file_transfer_total_mb_1min": float(window.sizes_mb[mask][codes == 2].sum()),
         }
         
         return context
     
-    def process_event(self, event: Dict) -> Optional[Dict]:
-        """Process a single event and generate alert if needed."""
+    def _evaluate_event(self, event: Dict) -> Tuple[bool, List[str], Dict]:
+        """Record an event in history and run rules; return rule result and ML context."""
         # Update history
         self.history_window.append(event)
         
         # Rule-based detection
         rule_alert, rule_reasons = self.rule_detector.evaluate_rules(event)
         
-        # ML-based detection
-        history_context = self.get_history_context(event.get("timestamp", time.time()))
-        ml_score, ml_info = self.ml_detector.predict(event, history_context)
+        history_context = self.get_history_context(_event_time(event))
+        return rule_alert, rule_reasons, history_context
+    
+    def _build_alert(self, event: Dict, rule_alert: bool, rule_reasons: List[str],
+                     ml_score: float, ml_info: Dict) -> Optional[Dict]:
+        """Combine rule and ML results into an alert, or None."""
         ml_alert = ml_score > 0.5  # Threshold
         
         # Combine results
@@ -257,10 +456,13 @@ class HybridDetector:
         if not is_alert:
             return None
         
-        # Generate alert
+        # Generate alert; ids stay unique when a batch lands in the same millisecond
+        now = time.time()
+        alert_ms = max(int(now * 1000), self._last_alert_ms + 1)
+        self._last_alert_ms = alert_ms
         alert = {
-            "alert_id": f"ALERT_{int(time.time() * 1000)}",
-            "timestamp": event.get("timestamp", time.time()),
+            "alert_id": f"ALERT_{alert_ms}",
+            "timestamp": event.get("timestamp", now),
             "event": event,
             "detection_methods": [],
             "reasons": [],
@@ -279,12 +481,53 @@ class HybridDetector:
         
         return alert
     
+    def process_event(self, event: Dict) -> Optional[Dict]:
+        """Process a single event and generate alert if needed."""
+        rule_alert, rule_reasons, history_context = self._evaluate_event(event)
+        
+        # ML-based detection
+        if rule_alert and self.fast_path_on_rule_alert:
+            ml_score, ml_info = 0.0, {"skipped": True}
+        else:
+            ml_score, ml_info = self.ml_detector.predict(event, history_context)
+        
+        return self._build_alert(event, rule_alert, rule_reasons, ml_score, ml_info)
+    
+    def process_events(self, events: List[Dict]) -> List[Optional[Dict]]:
+        """Process a batch of events, scoring them with one ML call."""
+        if not events:
+            return []
+        
+        # Rules and history context stay sequential so each event sees its predecessors
+        evaluated = [self._evaluate_event(event) for event in events]
+        
+        # ML-based detection, over the events still undecided when the fast path is on
+        if self.fast_path_on_rule_alert:
+            scored = [i for i, (rule_alert, _, _) in enumerate(evaluated) if not rule_alert]
+            ml_scores = np.zeros(len(events))
+            ml_infos = [{"skipped": True} for _ in events]
+            if scored:
+                scores, infos = self.ml_detector.predict_batch(
+                    [events[i] for i in scored], [evaluated[i][2] for i in scored]
+                )
+                ml_scores[scored] = scores
+                for i, info in zip(scored, infos):
+                    ml_infos[i] = info
+        else:
+            ml_scores, ml_infos = self.ml_detector.predict_batch(events, [e[2] for e in evaluated])
+        
+        return [
+            self._build_alert(event, rule_alert, rule_reasons, float(ml_score), ml_info)
+            for event, (rule_alert, rule_reasons, _), ml_score, ml_info
+            in zip(events, evaluated, ml_scores, ml_infos)
+        ]
+    
     def generate_forensic_json(self, alert: Dict) -> Dict:
         """Generate forensic JSON anchor for blockchain."""
         forensic = {
             "forensic_id": alert["alert_id"],
             "timestamp": alert["timestamp"],
-            "datetime": datetime.fromtimestamp(alert["timestamp"]).isoformat(),
+            "datetime": iso_timestamp(alert["timestamp"]),
             "event_type": alert["event"].get("event_type"),
             "detection_methods": alert["detection_methods"],
             "reasons": alert["reasons"],
@@ -297,16 +540,95 @@ class HybridDetector:
         
         # Save forensic JSON
         forensic_file = self.forensic_dir / f"{alert['alert_id']}.json"
-        with open(forensic_file, 'w') as f:
-            json.dump(forensic, f, indent=2)
+        forensic_file.write_bytes(orjson.dumps(forensic, option=orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE))
+        
+        # Sidecar with the canonical content hash so anchoring can skip reparsing
+        forensic_file.with_suffix('.sha256').write_text(self._compute_hash(forensic) + '\n')
         
         return forensic
     
     def _compute_hash(self, alert: Dict) -> str:
         """Compute hash of alert for integrity verification."""
-        import hashlib
-        alert_str = json.dumps(alert, sort_keys=True)
-        return hashlib.sha256(alert_str.encode()).hexdigest()
+        return hashlib.sha256(orjson.dumps(alert, option=orjson.OPT_SORT_KEYS)).hexdigest()
+    
+    EVENTS_READ_CHUNK = 1 << 20
+    
+    def _read_new_events(self) -> Iterator[List[Dict]]:
+        """Yield batches of events appended to the events file since the last poll."""
+        if self._events_fh is None:
+            self._events_fh = open(self.events_file, 'rb', buffering=1 << 16)
+        
+        try:
+            rotated = os.stat(self.events_file).st_ino != os.fstat(self._events_fh.fileno()).st_ino
+        except FileNotFoundError:
+            rotated = False  # Renamed away but not recreated yet; keep tailing the old file
+        if rotated:
+            # Finish the renamed file, then follow the new one from its start
+            yield from self._read_events_from(self._events_fh)
+            self._events_fh.close()
+            self._events_fh = open(self.events_file, 'rb', buffering=1 << 16)
+            self._last_offset = 0
+            self._partial = b""
+        
+        yield from self._read_events_from(self._events_fh)
+    
+    def _read_events_from(self, fh) -> Iterator[List[Dict]]:
+        """Yield batches of events from fh past the last offset, up to its current end."""
+        if os.fstat(fh.fileno()).st_size < self._last_offset:
+            # File was truncated in place; start again from the top
+            self._last_offset = 0
+            self._partial = b""
+        
+        fh.seek(self._last_offset)
+        while True:
+            # Bounded reads keep memory flat however far behind the tail we are
+            chunk = fh.read(self.EVENTS_READ_CHUNK)
+            self._last_offset = fh.tell()
+            if not chunk and not self._partial:
+                return
+            at_eof = len(chunk) < self.EVENTS_READ_CHUNK
+            
+            lines = (self._partial + chunk).split(b'\n')
+            self._partial = lines.pop()
+            if at_eof and self._partial.strip():
+                # An unterminated line that already parses is a complete event
+                try:
+                    orjson.loads(self._partial)
+                    lines.append(self._partial)
+                    self._partial = b""
+                except orjson.JSONDecodeError:
+                    pass
+            
+            events = []
+            for line in lines:
+                if not line.strip():
+                    continue
+                try:
+                    events.append(orjson.loads(line))
+                except orjson.JSONDecodeError:
+                    continue
+            if events:
+                yield events
+            if at_eof:
+                return
+    
+    def _write_alert(self, alert: Dict):
+        """Append an alert to the buffered alerts log; flushed once per poll tick."""
+        if self._alerts_fh is None or self._alerts_fh_path != self.alerts_file:
+            if self._alerts_fh is not None:
+                self._alerts_fh.close()
+            self._alerts_fh = open(self.alerts_file, 'ab', buffering=1 << 16)
+            self._alerts_fh_path = self.alerts_file
+        self._alerts_fh.write(orjson.dumps(alert) + b'\n')
+    
+    def close(self):
+        """Close the events and alerts file handles."""
+        if self._events_fh is not None:
+            self._events_fh.close()
+            self._events_fh = None
+        if self._alerts_fh is not None:
+            self._alerts_fh.close()
+            self._alerts_fh = None
     
     def poll_events(self, continuous: bool = False):
         """Poll events file and process new events."""
@@ -316,34 +638,23 @@ class HybridDetector:
         
         while True:
             try:
-                with open(self.events_file, 'r') as f:
-                    lines = f.readlines()
-                
-                new_events = []
-                for i, line in enumerate(lines):
-                    if i not in self.processed_lines:
-                        try:
-                            event = json.loads(line.strip())
-                            new_events.append((i, event))
-                            self.processed_lines.add(i)
-                        except json.JSONDecodeError:
-                            continue
+                # Process new events one read chunk at a time
+                for new_events in self._read_new_events():
+                    for alert in self.process_events(new_events):
+                        if alert:
+                            # Save alert
+                            self._write_alert(alert)
+                            
+                            # Generate forensic JSON
+                            forensic = self.generate_forensic_json(alert)
+                            
+                            print(f"[Detector] ALERT: {alert['alert_id']}")
+                            print(f"  Reasons: {', '.join(alert['reasons'])}")
+                            print(f"  Severity: {alert['severity']}")
+                            print(f"  Forensic: {forensic['forensic_id']}.json")
                 
-                # Process new events
-                for line_num, event in new_events:
-                    alert = self.process_event(event)
-                    if alert:
-                        # Save alert
-                        with open(self.alerts_file, 'a') as f:
-                            f.write(json.dumps(alert) + '\n')
-                        
-                        # Generate forensic JSON
-                        forensic = self.generate_forensic_json(alert)
-                        
-                        print(f"[Detector] ALERT: {alert['alert_id']}")
-                        print(f"  Reasons: {', '.join(alert['reasons'])}")
-                        print(f"  Severity: {alert['severity']}")
-                        print(f"  Forensic: {forensic['forensic_id']}.json")
+                if self._alerts_fh is not None:
+                    self._alerts_fh.flush()
                 
                 if not continuous:
                     break
@@ -7,93 +7,353 @@ Simpler alternative to full blockchain for MVP.
 
 import json
 import hashlib
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Union
 from datetime import datetime
 import time
+import orjson
+
+
+@lru_cache(maxsize=1024)
+def _iso_for_second(ts_int: int) -> str:
+    """ISO-8601 local time for a whole-second timestamp."""
+    return datetime.fromtimestamp(ts_int).isoformat()
+
+
+def iso_timestamp(ts: float) -> str:
+    """Same output as datetime.fromtimestamp(ts).isoformat(), cached per second."""
+    frac, whole = math.modf(ts)
+    us = round(frac * 1e6)
+    if us >= 1000000:
+        whole += 1
+        us -= 1000000
+    elif us < 0:
+        whole -= 1
+        us += 1000000
+    base = _iso_for_second(int(whole))
+    return f"{base}.{us:06d}" if us else base
+
+
+# Content hashes computed this process, keyed by path and guarded by the file's stat
+# signature; ctime moves on any write or utime, so a rewrite can't reuse a stale entry
+_content_hash_cache: Dict[str, tuple] = {}
+
+# Root format recorded in new anchors; anchors without one use the legacy encoding
+HASH_SCHEME = "sha256-canonical-orjson-v2"
 
 
 class MerkleTree:
     """Simple Merkle tree implementation for forensic anchoring."""
     
+    # Levels with at least this many parent nodes are hashed across worker threads
+    PARALLEL_MIN_PAIRS = 4096
+    
+    # Roots over at least this many files hash the files across worker threads
+    PARALLEL_MIN_FILES = 256
+    
+    # Files changed more recently than this are rehashed on every call
+    HASH_CACHE_MIN_AGE_NS = 1_000_000_000
+    
     @staticmethod
-    def hash_data(data: str) -> str:
+    def hash_data(data: Union[str, bytes]) -> str:
         """Hash data using SHA-256."""
-        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        return hashlib.sha256(data).hexdigest()
+    
+    @staticmethod
+    def _leaf_digest(leaf: Union[str, bytes]) -> bytes:
+        """Return the raw 32-byte digest for a leaf given as bytes or hex."""
+        if isinstance(leaf, bytes):
+            return leaf
+        if len(leaf) == 64:
+            try:
+                return bytes.fromhex(leaf)
+            except ValueError:
+                pass
+        return hashlib.sha256(leaf.encode('utf-8')).digest()
     
     @staticmethod
-    def build_tree(hashes: List[str]) -> Dict:
+    def _hash_pairs(src: memoryview, dst: memoryview, start: int, stop: int):
+        """Hash child pairs start..stop of src into parent slots of dst."""
+        sha256 = hashlib.sha256
+        for i in range(start, stop):
+            dst[i * 32:(i + 1) * 32] = sha256(src[i * 64:(i + 1) * 64]).digest()
+    
+    @staticmethod
+    def build_tree(hashes: List[Union[str, bytes]]) -> Dict:
         """Build Merkle tree from list of hashes."""
         if not hashes:
             return {"root": "", "tree": {}}
         
+        # Parents hash the 64-byte concatenation of raw child digests
+        leaves = [MerkleTree._leaf_digest(h) for h in hashes]
+        
         # Ensure even number of leaves
-        if len(hashes) % 2 == 1:
-            hashes.append(hashes[-1])  # Duplicate last hash
+        if len(leaves) % 2 == 1:
+            leaves.append(leaves[-1])  # Duplicate last hash
         
-        tree = {"leaves": hashes.copy()}
-        current_level = hashes
+        tree = {"leaves": [h.hex() for h in leaves]}
         
-        level = 0
-        while len(current_level) > 1:
-            next_level = []
-            for i in range(0, len(current_level), 2):
-                left = current_level[i]
-                right = current_level[i + 1] if i + 1 < len(current_level) else current_level[i]
-                combined = left + right
-                parent_hash = MerkleTree.hash_data(combined)
-                next_level.append(parent_hash)
-            
-            tree[f"level_{level}"] = next_level
-            current_level = next_level
-            level += 1
+        # One flat buffer of digests; each level overwrites the front of the previous one
+        buf = bytearray(b"".join(leaves))
+        view = memoryview(buf)
+        width = len(leaves)
+        workers = os.cpu_count() or 1
+        executor = None
+        while width > 1:
+            if width % 2 == 1:
+                view[width * 32:(width + 1) * 32] = view[(width - 1) * 32:width * 32]
+                width += 1
+            pairs = width // 2
+            if pairs < MerkleTree.PARALLEL_MIN_PAIRS:
+                MerkleTree._hash_pairs(view, view, 0, pairs)
+            else:
+                # Workers write disjoint slices of a separate level buffer
+                if executor is None:
+                    executor = ThreadPoolExecutor(max_workers=workers)
+                out = bytearray(pairs * 32)
+                out_view = memoryview(out)
+                step = -(-pairs // workers)
+                list(executor.map(
+                    lambda start: MerkleTree._hash_pairs(view, out_view, start, min(start + step, pairs)),
+                    range(0, pairs, step)
+                ))
+                out_view.release()
+                view[:pairs * 32] = out
+            width = pairs
         
-        root_hash = current_level[0] if current_level else ""
-        tree["root"] = root_hash
+        if executor is not None:
+            executor.shutdown()
+        view.release()
+        tree["root"] = buf[:32].hex()
         
         return tree
     
     @staticmethod
-    def create_merkle_root(forensic_files: List[Path]) -> str:
-        """Create Merkle root from forensic JSON files."""
-        hashes = []
+    def file_hash(forensic_file: Union[str, Path], use_sidecar: bool = True) -> bytes:
+        """Return the canonical SHA-256 of a forensic JSON file."""
+        forensic_file = os.fspath(forensic_file)
+        if use_sidecar:
+            sidecar = os.path.splitext(forensic_file)[0] + '.sha256'
+            try:
+                with open(sidecar, 'r') as f:
+                    return bytes.fromhex(f.read().strip())
+            except (OSError, ValueError):
+                pass
         
-        for forensic_file in sorted(forensic_files):
-            if forensic_file.exists():
-                with open(forensic_file, 'r') as f:
-                    data = json.load(f)
-                    # Use forensic_id + hash for consistency
-                    content = json.dumps(data, sort_keys=True)
-                    file_hash = MerkleTree.hash_data(content)
-                    hashes.append(file_hash)
+        with open(forensic_file, 'rb') as f:
+            st = os.fstat(f.fileno())
+            signature = (st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns)
+            cached = _content_hash_cache.get(forensic_file)
+            if cached is not None and cached[0] == signature:
+                return cached[1]
+            data = orjson.loads(f.read())
+        content = orjson.dumps(data, option=orjson.OPT_SORT_KEYS)
+        digest = hashlib.sha256(content).digest()
+        # Racy-clean guard: a same-size rewrite within one timestamp tick keeps the
+        # signature, so only files untouched for a while are cached
+        if time.time_ns() - st.st_ctime_ns > MerkleTree.HASH_CACHE_MIN_AGE_NS:
+            _content_hash_cache[forensic_file] = (signature, digest)
+        return digest
+    
+    @staticmethod
+    def fold_leaf(frontier: List[Optional[bytes]], leaf_count: int, leaf: bytes):
+        """Append a leaf digest to a frontier of complete left subtrees (one slot per level)."""
+        sha256 = hashlib.sha256
+        level = 0
+        while leaf_count >> level & 1:
+            leaf = sha256(frontier[level] + leaf).digest()
+            level += 1
+        if level == len(frontier):
+            frontier.append(None)
+        frontier[level] = leaf
+    
+    @staticmethod
+    def frontier_root(frontier: List[Optional[bytes]], leaf_count: int) -> str:
+        """Root of the tree build_tree would give for the folded leaves, from the frontier alone."""
+        if leaf_count == 0:
+            return ""
+        
+        sha256 = hashlib.sha256
+        partial = None  # Hash of the trailing incomplete subtree at the current level
+        level = 0
+        # Level 0 always pairs up, since build_tree pads a single leaf to two
+        while level == 0 or (leaf_count >> level) + (partial is not None) > 1:
+            if leaf_count >> level & 1:
+                # Unpaired complete node takes the partial as its sibling, else is duplicated
+                partial = sha256(frontier[level] + (partial or frontier[level])).digest()
+            elif partial is not None:
+                # Odd level width: build_tree duplicates the last node
+                partial = sha256(partial + partial).digest()
+            level += 1
+        return (partial or frontier[level]).hex()
+    
+    @staticmethod
+    def _file_hashes(paths: List[str], use_sidecars: bool) -> List[bytes]:
+        """Leaf digests for paths in order; missing files are skipped without a separate stat."""
+        hashes = []
+        for path in paths:
+            try:
+                hashes.append(MerkleTree.file_hash(path, use_sidecars))
+            except FileNotFoundError:
+                continue
+        return hashes
+    
+    @staticmethod
+    def create_merkle_root(forensic_files: List[Union[str, Path]], use_sidecars: bool = True) -> str:
+        """Create Merkle root from forensic JSON files."""
+        # Plain string ordering keeps the root reproducible
+        paths = sorted(map(os.fspath, forensic_files))
+        workers = os.cpu_count() or 1
+        if workers > 1 and len(paths) >= MerkleTree.PARALLEL_MIN_FILES:
+            # File reads and large digests release the GIL; each worker hashes a contiguous slice
+            step = -(-len(paths) // workers)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                slices = executor.map(
+                    lambda start: MerkleTree._file_hashes(paths[start:start + step], use_sidecars),
+                    range(0, len(paths), step)
+                )
+                hashes = [h for part in slices for h in part]
+        else:
+            hashes = MerkleTree._file_hashes(paths, use_sidecars)
         
         if not hashes:
             return ""
         
         tree = MerkleTree.build_tree(hashes)
         return tree["root"]
+    
+    @staticmethod
+    def legacy_file_hash(forensic_file: Union[str, Path]) -> str:
+        """Hex leaf of the legacy scheme: SHA-256 of json.dumps(sort_keys=True)."""
+        with open(forensic_file, 'r') as f:
+            data = json.load(f)
+        return MerkleTree.hash_data(json.dumps(data, sort_keys=True))
+    
+    @staticmethod
+    def create_legacy_merkle_root(forensic_files: List[Union[str, Path]]) -> str:
+        """Merkle root as computed for anchors created before hash_scheme was recorded."""
+        hashes = []
+        for forensic_file in sorted(map(os.fspath, forensic_files)):
+            try:
+                hashes.append(MerkleTree.legacy_file_hash(forensic_file))
+            except FileNotFoundError:
+                continue
+        
+        return MerkleTree.legacy_root(hashes)
+    
+    @staticmethod
+    def legacy_root(hashes: List[str]) -> str:
+        """Legacy root: parents hash the concatenated hex strings of their children."""
+        if not hashes:
+            return ""
+        
+        level = list(hashes)
+        while len(level) > 1:
+            if len(level) % 2 == 1:
+                level.append(level[-1])  # Duplicate last hash
+            level = [MerkleTree.hash_data(level[i] + level[i + 1]) for i in range(0, len(level), 2)]
+        
+        # A single leaf was still paired with itself
+        return level[0] if len(hashes) > 1 else MerkleTree.hash_data(hashes[0] + hashes[0])
 
 
 class ForensicAnchoring:
     """Anchors forensic events using Merkle tree."""
     
+    # Incremental tree state; not *.json so anchor listings skip it
+    FRONTIER_FILE = "merkle_frontier.state"
+    
     def __init__(self, forensic_dir: str = "forensic", anchors_dir: str = "anchors"):
         self.forensic_dir = Path(forensic_dir)
         self.anchors_dir = Path(anchors_dir)
         self.anchors_dir.mkdir(parents=True, exist_ok=True)
+        self._frontier_file = self.anchors_dir / self.FRONTIER_FILE
+        self._load_frontier()
+    
+    def _reset_frontier(self):
+        """Forget all folded leaves."""
+        self._frontier: List[Optional[bytes]] = []
+        # (name, st_ino, st_size, st_mtime_ns, st_ctime_ns) of each folded leaf, in leaf order
+        self._leaf_signatures: List[Tuple[str, int, int, int, int]] = []
+    
+    def _load_frontier(self):
+        """Restore the folded leaves of previous anchors, if they cover this forensic dir."""
+        self._reset_frontier()
+        try:
+            with open(self._frontier_file, 'rb') as f:
+                state = orjson.loads(f.read())
+            if state["forensic_dir"] != os.fspath(self.forensic_dir):
+                return
+            self._frontier = [bytes.fromhex(h) if h else None for h in state["frontier"]]
+            self._leaf_signatures = [
+                (name, ino, size, mtime_ns, ctime_ns)
+                for name, ino, size, mtime_ns, ctime_ns in state["leaf_signatures"]
+            ]
+        except (OSError, ValueError, KeyError, TypeError):
+            self._reset_frontier()
+    
+    def _save_frontier(self):
+        """Persist the frontier atomically next to the anchors."""
+        state = {
+            "forensic_dir": os.fspath(self.forensic_dir),
+            "frontier": [h.hex() if h else None for h in self._frontier],
+            "leaf_signatures": self._leaf_signatures
+        }
+        tmp_file = self._frontier_file.with_suffix(".tmp")
+        tmp_file.write_bytes(orjson.dumps(state))
+        os.replace(tmp_file, self._frontier_file)
+    
+    def _fold_new_files(self, signatures: List[Tuple[str, int, int, int, int]]):
+        """Fold forensic files added since the last anchor into the frontier."""
+        folded = len(self._leaf_signatures)
+        if signatures[:folded] != self._leaf_signatures:
+            # A folded file was removed, rewritten, or a new one sorts before it: start over
+            self._reset_frontier()
+            folded = 0
+        
+        for signature in signatures[folded:]:
+            try:
+                leaf = MerkleTree.file_hash(os.path.join(self.forensic_dir, signature[0]))
+            except FileNotFoundError:
+                continue
+            MerkleTree.fold_leaf(self._frontier, len(self._leaf_signatures), leaf)
+            self._leaf_signatures.append(signature)
     
     def create_anchor(self, anchor_id: Optional[str] = None) -> Dict:
         """Create a Merkle anchor from all forensic files."""
-        forensic_files = list(self.forensic_dir.glob("*.json"))
+        signatures = []
+        try:
+            with os.scandir(self.forensic_dir) as it:
+                for e in it:
+                    if not (e.name.endswith(".json") and e.is_file()):
+                        continue
+                    try:
+                        st = e.stat()
+                    except FileNotFoundError:
+                        continue
+                    # Same fields as the file_hash cache key; ctime moves on any rewrite
+                    signatures.append((e.name, st.st_ino, st.st_size, st.st_mtime_ns, st.st_ctime_ns))
+        except FileNotFoundError:
+            pass
+        signatures.sort()
         
-        if not forensic_files:
+        if not signatures:
             print("[Anchoring] No forensic files found")
             return {}
         
-        print(f"[Anchoring] Creating anchor from {len(forensic_files)} forensic files...")
+        print(f"[Anchoring] Creating anchor from {len(signatures)} forensic files...")
         
-        # Create Merkle root
-        merkle_root = MerkleTree.create_merkle_root(forensic_files)
+        # Only files added since the last anchor are hashed; earlier leaves live in the frontier
+        self._fold_new_files(signatures)
+        self._save_frontier()
+        forensic_files = [signature[0] for signature in self._leaf_signatures]
+        merkle_root = MerkleTree.frontier_root(self._frontier, len(forensic_files))
         
         if not merkle_root:
             print("[Anchoring] Failed to create Merkle root")
@@ -103,13 +363,15 @@ class ForensicAnchoring:
         if anchor_id is None:
             anchor_id = f"ANCHOR_{int(time.time() * 1000)}"
         
+        now = time.time()
         anchor = {
             "anchor_id": anchor_id,
-            "timestamp": time.time(),
-            "datetime": datetime.now().isoformat(),
+            "timestamp": now,
+            "datetime": iso_timestamp(now),
             "merkle_root": merkle_root,
+            "hash_scheme": HASH_SCHEME,
             "forensic_count": len(forensic_files),
-            "forensic_files": [str(f.name) for f in forensic_files],
+            "forensic_files": list(forensic_files),
             "verification": {
                 "algorithm": "SHA-256",
                 "tree_type": "Merkle",
@@ -141,9 +403,16 @@ class ForensicAnchoring:
         with open(anchor_file, 'r') as f:
             anchor = json.load(f)
         
-        # Recompute Merkle root
+        # Recompute Merkle root from file contents; sidecars are not trusted here
         forensic_files = [self.forensic_dir / f for f in anchor.get("forensic_files", [])]
-        computed_root = MerkleTree.create_merkle_root(forensic_files)
+        hash_scheme = anchor.get("hash_scheme")
+        if hash_scheme is None:
+            computed_root = MerkleTree.create_legacy_merkle_root(forensic_files)
+        elif hash_scheme == HASH_SCHEME:
+            computed_root = MerkleTree.create_merkle_root(forensic_files, use_sidecars=False)
+        else:
+            print(f"[Anchoring] Anchor {anchor_file.name} uses unknown hash scheme {hash_scheme}")
+            return False
         
         stored_root = anchor.get("merkle_root", "")
         
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Compile model script - export the detection RandomForest to ONNX
+"""
+import sys
+from pathlib import Path
+
+import joblib
+from skl2onnx import convert_sklearn
+from skl2onnx.common.data_types import FloatTensorType
+
+
+def compile_model(model_path: Path) -> Path:
+    """Convert the joblib model bundle to an .onnx file next to it"""
+    model_data = joblib.load(model_path)
+    model = model_data["model"]
+    
+    onx = convert_sklearn(
+        model,
+        initial_types=[("X", FloatTensorType([None, model.n_features_in_]))],
+        options={id(model): {"zipmap": False}}  # Plain probability tensor output
+    )
+    
+    onnx_path = model_path.with_suffix(".onnx")
+    onnx_path.write_bytes(onx.SerializeToString())
+    return onnx_path
+
+
+def main():
+    """Main compile function"""
+    model_path = Path(sys.argv[1] if len(sys.argv) > 1 else "models/detection_model.pkl")
+    if not model_path.exists():
+        print(f"Model not found at {model_path}")
+        sys.exit(1)
+    
+    onnx_path = compile_model(model_path)
+    print(f"Compiled ONNX model to {onnx_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -144,7 +144,7 @@ def create_sample_ml_model():
         "model": model,
         "feature_names": [f"feature_{i}" for i in range(10)]
     }
-    joblib.dump(model_data, model_path)
+    joblib.dump(model_data, model_path, compress=0, protocol=5)  # Uncompressed so loads skip decompression
     print(f"Created sample ML model at {model_path}")
 
 
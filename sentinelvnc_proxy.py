@@ -6,18 +6,117 @@ and supports containment actions.
 
 This is a security monitoring tool - all attack detection is benign and for testing only.
 """
+import os
+import queue
+import select
 import socket
+import selectors
+import multiprocessing
 import threading
 import time
 import json
 import argparse
 import logging
-from typing import Dict, Optional, Tuple
-from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
 from datetime import datetime
+import numpy as np
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 from urllib.parse import urljoin
 
+# Cheap clock for session bookkeeping; the heuristic windows only need second resolution
+MONOTONIC_CLOCK = getattr(time, "CLOCK_MONOTONIC_COARSE", time.CLOCK_MONOTONIC)
+
+# Heuristic codes returned by the session stats kernel
+HEURISTIC_NONE = 0
+HEURISTIC_CLIPBOARD = 1
+HEURISTIC_FRAMEBURST = 2
+HEURISTIC_FILE_TRANSFER = 3
+
+# Slots in the per-session int64 stats array
+STAT_C2S_BYTES = 0
+STAT_S2C_BYTES = 1
+STAT_C2S_PACKETS = 2
+STAT_S2C_PACKETS = 3
+STAT_SAMPLE_HEAD = 4
+STAT_SAMPLE_COUNT = 5
+STAT_RECENT10_SUM = 6  # Client->server bytes in the last 10 samples
+STAT_WINDOW_SUM = 7  # Client->server bytes inside the rate window
+STAT_WINDOW_HEAD = 8  # Oldest entry of the rate-window ring
+STAT_WINDOW_LEN = 9
+N_STATS = 10
+
+
+def _make_session_stats_updater(
+    window_sec, clipboard_threshold_bytes, frameburst_threshold_bytes, rate_threshold_bytes
+):
+    """Build the per-chunk kernel with the proxy's thresholds baked in as constants."""
+    def update(
+        stats, sample_ts, sample_bytes, window_ts, window_bytes,
+        client_to_server, data_size, now
+    ):
+        """Record one chunk in the session arrays and return the triggered heuristic code."""
+        history = sample_ts.shape[0]
+        head = stats[STAT_SAMPLE_HEAD]
+        
+        # The sample ten slots back leaves the burst window (zero until the ring has 10)
+        dropped = sample_bytes[(head - 10 + history) % history]
+        if dropped > 0:
+            stats[STAT_RECENT10_SUM] -= dropped
+        
+        sample_ts[head] = now
+        if client_to_server:
+            sample_bytes[head] = data_size
+            stats[STAT_C2S_BYTES] += data_size
+            stats[STAT_C2S_PACKETS] += 1
+            stats[STAT_RECENT10_SUM] += data_size
+            
+            # Rate window ring; when full the oldest entry is dropped early
+            capacity = window_ts.shape[0]
+            oldest = stats[STAT_WINDOW_HEAD]
+            length = stats[STAT_WINDOW_LEN]
+            if length == capacity:
+                stats[STAT_WINDOW_SUM] -= window_bytes[oldest]
+                oldest = (oldest + 1) % capacity
+                length -= 1
+            slot = (oldest + length) % capacity
+            window_ts[slot] = now
+            window_bytes[slot] = data_size
+            stats[STAT_WINDOW_SUM] += data_size
+            length += 1
+            window_start = now - window_sec
+            while window_ts[oldest] < window_start:
+                stats[STAT_WINDOW_SUM] -= window_bytes[oldest]
+                oldest = (oldest + 1) % capacity
+                length -= 1
+            stats[STAT_WINDOW_HEAD] = oldest
+            stats[STAT_WINDOW_LEN] = length
+        else:
+            sample_bytes[head] = -data_size
+            stats[STAT_S2C_BYTES] += data_size
+            stats[STAT_S2C_PACKETS] += 1
+        
+        stats[STAT_SAMPLE_HEAD] = (head + 1) % history
+        if stats[STAT_SAMPLE_COUNT] < history:
+            stats[STAT_SAMPLE_COUNT] += 1
+        
+        if client_to_server:
+            if stats[STAT_RECENT10_SUM] > clipboard_threshold_bytes:
+                return HEURISTIC_CLIPBOARD
+            if stats[STAT_WINDOW_SUM] > rate_threshold_bytes:
+                return HEURISTIC_FILE_TRANSFER
+        elif data_size > frameburst_threshold_bytes:
+            return HEURISTIC_FRAMEBURST
+        return HEURISTIC_NONE
+    
+    try:
+        from numba import njit
+        # Per-session arrays are never shared, so the kernel can run without the GIL
+        return njit(cache=True, nogil=True)(update)
+    except ImportError:
+        return update
+
 
 class VNCProxy:
     """
@@ -25,6 +124,13 @@ class VNCProxy:
     Monitors traffic and detects exfiltration heuristics.
     """
     
+    RECV_BUFFER_SIZE = 64 * 1024  # Largest chunk moved (and sampled) per read
+    SOCKET_RCVBUF = 1 << 20
+    SAMPLE_HISTORY = 100  # Samples kept per session for heuristics
+    RATE_WINDOW_CAPACITY = 8192  # Client->server chunks tracked in the rate window
+    ALERT_LOG_BUFFER_BYTES = 64 * 1024  # Flush the alert log once this much is buffered
+    ALERT_LOG_FLUSH_SEC = 0.01  # ...or once the oldest buffered alert is this old
+    
     def __init__(
         self,
         listen_host: str = "0.0.0.0",
@@ -36,7 +142,10 @@ class VNCProxy:
         clipboard_threshold_kb: int = 200,
         frameburst_threshold_bytes: int = 10 * 1024 * 1024,  # 10MB
         file_transfer_rate_threshold_kbps: int = 1000,  # 1MB/s
-        file_transfer_window_sec: int = 5
+        file_transfer_window_sec: int = 5,
+        workers: int = 1,
+        max_sessions: int = 1024,
+        alert_log: Optional[str] = None
     ):
         self.listen_host = listen_host
         self.listen_port = listen_port
@@ -44,16 +153,49 @@ class VNCProxy:
         self.server_port = server_port
         self.alert_url = alert_url
         self.contain_on_alert = contain_on_alert
+        self.alert_log = alert_log  # Optional local JSONL copy of every alert sent
+        # Each worker process owns its own listener and session state
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
         
         # Heuristic thresholds
         self.clipboard_threshold_kb = clipboard_threshold_kb
         self.frameburst_threshold_bytes = frameburst_threshold_bytes
         self.file_transfer_rate_threshold_kbps = file_transfer_rate_threshold_kbps
         self.file_transfer_window_sec = file_transfer_window_sec
+        self._update_session_stats = _make_session_stats_updater(
+            float(file_transfer_window_sec),
+            clipboard_threshold_kb * 1024,
+            frameburst_threshold_bytes,
+            # kbps over the window, converted to a byte total
+            file_transfer_rate_threshold_kbps * file_transfer_window_sec * 1024 / 8
+        )
+        # Compile the kernel now rather than on the first packet of a live session
+        self._update_session_stats(
+            np.zeros(N_STATS, dtype=np.int64), np.zeros(1, dtype=np.float64), np.zeros(1, dtype=np.int64),
+            np.zeros(1, dtype=np.float64), np.zeros(1, dtype=np.int64), True, 0, 0.0
+        )
         
-        # Session tracking
+        # Session tracking: the dict maps ids to session info, while numeric
+        # per-session state lives in contiguous arrays indexed by session slot
         self.sessions: Dict[str, Dict] = {}
-        self.contained_sessions = set()
+        self.max_sessions = max_sessions
+        self._free_slots = list(range(max_sessions - 1, -1, -1))
+        self._stats = np.zeros((max_sessions, N_STATS), dtype=np.int64)
+        self._sample_ts = np.zeros((max_sessions, self.SAMPLE_HISTORY), dtype=np.float64)
+        self._sample_bytes = np.zeros((max_sessions, self.SAMPLE_HISTORY), dtype=np.int64)
+        self._start_time = np.zeros(max_sessions, dtype=np.float64)
+        self._last_activity = np.zeros(max_sessions, dtype=np.float64)
+        self._contained = np.zeros(max_sessions, dtype=np.uint8)
+        
+        # Alerts are posted by a background sender so forwarding never blocks on HTTP
+        self._alert_queue: queue.SimpleQueue = queue.SimpleQueue()
+        # (session_id, heuristic) pairs with an alert waiting in the queue;
+        # repeats are coalesced so a slow backend cannot grow the queue without bound
+        self._pending_alerts: Set[Tuple[str, str]] = set()
+        self._alerts_lock = threading.Lock()
+        
+        # Splice pipes are reused across sessions instead of created per connection
+        self._pipe_pool: queue.SimpleQueue = queue.SimpleQueue()
         
         # Logging
         logging.basicConfig(
@@ -66,223 +208,359 @@ class VNCProxy:
         """Generate unique session ID."""
         return f"session_{client_addr[0]}_{client_addr[1]}_{int(time.time())}"
     
-    def _create_session(self, session_id: str, client_addr: Tuple[str, int]) -> Dict:
-        """Create a new session tracking dict."""
+    def _create_session(self, session_id: str, client_addr: Tuple[str, int]) -> Optional[Dict]:
+        """Create a new session tracking dict, or return None when all slots are in use."""
+        try:
+            idx = self._free_slots.pop()
+        except IndexError:
+            return None
+        
+        now = time.clock_gettime(MONOTONIC_CLOCK)
+        self._stats[idx] = 0
+        self._sample_bytes[idx] = 0
+        self._start_time[idx] = now
+        self._last_activity[idx] = now
+        self._contained[idx] = 0
+        
+        # Writing to the wakeup socket interrupts the forwarder's select on containment
+        wakeup_r, wakeup_w = socket.socketpair()
+        wakeup_w.setblocking(False)
+        
         session = {
             "session_id": session_id,
             "client_ip": client_addr[0],
             "client_port": client_addr[1],
             "upstream_ip": self.server_host,
             "upstream_port": self.server_port,
-            "start_time": time.time(),
-            "client_to_server_bytes": 0,
-            "server_to_client_bytes": 0,
-            "client_to_server_packets": 0,
-            "server_to_client_packets": 0,
-            "recent_samples": deque(maxlen=100),  # Last 100 data points
-            "last_activity": time.time()
+            "idx": idx,
+            # Views into the slot's rows: counters, ring positions and running
+            # sums (see STAT_* slots), and the ring of recent samples whose bytes
+            # are signed by direction (positive client->server, negative server->client)
+            "stats": self._stats[idx],
+            "sample_ts": self._sample_ts[idx],
+            "sample_bytes": self._sample_bytes[idx],
+            # Client->server chunks inside the file-transfer rate window
+            "window_ts": np.zeros(self.RATE_WINDOW_CAPACITY, dtype=np.float64),
+            "window_bytes": np.zeros(self.RATE_WINDOW_CAPACITY, dtype=np.int64),
+            "wakeup_r": wakeup_r,
+            "wakeup_w": wakeup_w
         }
         self.sessions[session_id] = session
         return session
     
+    def _release_session(self, session: Dict):
+        """Forget a session and return its slot."""
+        if self.sessions.pop(session["session_id"], None) is not None:
+            session["wakeup_r"].close()
+            session["wakeup_w"].close()
+            self._free_slots.append(session["idx"])
+            # Marks the session closed once the sender has handled its earlier alerts
+            self._alert_queue.put((session["session_id"], None, None, None, None))
+    
+    def _contain(self, session: Dict):
+        """Flag a live session as contained and wake its forwarder so it closes."""
+        # The slot may already belong to a newer session
+        if self.sessions.get(session["session_id"]) is not session:
+            return
+        self._contained[session["idx"]] = 1
+        try:
+            session["wakeup_w"].send(b"\0")
+        except OSError:
+            pass
+    
+    def idle_sessions(self, idle_timeout: float) -> List[str]:
+        """Return ids of sessions with no traffic for idle_timeout seconds."""
+        cutoff = time.clock_gettime(MONOTONIC_CLOCK) - idle_timeout
+        idle = set(np.flatnonzero(self._last_activity < cutoff).tolist())
+        return [sid for sid, session in list(self.sessions.items()) if session["idx"] in idle]
+    
     def _check_heuristics(self, session: Dict, direction: str, data_size: int) -> Optional[Dict]:
         """
         Check if heuristics are triggered.
         Returns alert dict if triggered, None otherwise.
         """
-        current_time = time.time()
-        session["last_activity"] = current_time
+        current_time = time.clock_gettime(MONOTONIC_CLOCK)
+        self._last_activity[session["idx"]] = current_time
         
-        # Update counters
-        if direction == "client_to_server":
-            session["client_to_server_bytes"] += data_size
-            session["client_to_server_packets"] += 1
-        else:
-            session["server_to_client_bytes"] += data_size
-            session["server_to_client_packets"] += 1
-        
-        # Store recent sample
-        sample = {
-            "timestamp": current_time,
-            "direction": direction,
-            "bytes": data_size
-        }
-        session["recent_samples"].append(sample)
+        # Update counters and sample history
+        stats = session["stats"]
+        heuristic = self._update_session_stats(
+            stats, session["sample_ts"], session["sample_bytes"],
+            session["window_ts"], session["window_bytes"],
+            direction == "client_to_server", data_size, current_time
+        )
+        if heuristic == HEURISTIC_NONE:
+            return None
         
-        # Heuristic 1: Clipboard threshold (client->server burst)
-        if direction == "client_to_server":
-            # Check for sudden burst in client->server traffic
-            recent_samples = list(session["recent_samples"])[-10:]  # Last 10 samples
-            recent_client_bytes = sum(
-                s["bytes"] for s in recent_samples 
-                if s["direction"] == "client_to_server"
-            )
-            
-            if recent_client_bytes > (self.clipboard_threshold_kb * 1024):
-                return {
-                    "heuristic": "clipboard_exfiltration",
-                    "bytes": recent_client_bytes,
-                    "threshold_kb": self.clipboard_threshold_kb,
-                    "description": f"Client->server burst detected: {recent_client_bytes / 1024:.1f}KB"
-                }
+        # Heuristic 1: Clipboard threshold (client->server burst over the last 10 samples)
+        if heuristic == HEURISTIC_CLIPBOARD:
+            recent_client_bytes = int(stats[STAT_RECENT10_SUM])
+            return {
+                "heuristic": "clipboard_exfiltration",
+                "bytes": recent_client_bytes,
+                "threshold_kb": self.clipboard_threshold_kb,
+                "description": f"Client->server burst detected: {recent_client_bytes / 1024:.1f}KB"
+            }
         
         # Heuristic 2: Frameburst detection (server->client large frames)
-        if direction == "server_to_client":
-            if data_size > self.frameburst_threshold_bytes:
-                return {
-                    "heuristic": "frameburst",
-                    "bytes": data_size,
-                    "threshold_bytes": self.frameburst_threshold_bytes,
-                    "description": f"Large frame burst: {data_size / (1024*1024):.1f}MB"
-                }
+        if heuristic == HEURISTIC_FRAMEBURST:
+            return {
+                "heuristic": "frameburst",
+                "bytes": data_size,
+                "threshold_bytes": self.frameburst_threshold_bytes,
+                "description": f"Large frame burst: {data_size / (1024*1024):.1f}MB"
+            }
         
         # Heuristic 3: File-transfer-like detection (sustained high rate)
-        if direction == "client_to_server":
-            window_start = current_time - self.file_transfer_window_sec
-            window_samples = [
-                s for s in session["recent_samples"]
-                if s["timestamp"] >= window_start and s["direction"] == "client_to_server"
-            ]
-            window_bytes = sum(s["bytes"] for s in window_samples)
-            window_kbps = (window_bytes * 8) / (self.file_transfer_window_sec * 1024)
-            
-            if window_kbps > self.file_transfer_rate_threshold_kbps:
-                return {
-                    "heuristic": "file_transfer_like",
-                    "bytes": window_bytes,
-                    "rate_kbps": window_kbps,
-                    "threshold_kbps": self.file_transfer_rate_threshold_kbps,
-                    "description": f"Sustained high rate: {window_kbps:.1f} kbps over {self.file_transfer_window_sec}s"
-                }
-        
-        return None
+        window_bytes = int(stats[STAT_WINDOW_SUM])
+        window_kbps = (window_bytes * 8) / (self.file_transfer_window_sec * 1024)
+        return {
+            "heuristic": "file_transfer_like",
+            "bytes": window_bytes,
+            "rate_kbps": window_kbps,
+            "threshold_kbps": self.file_transfer_rate_threshold_kbps,
+            "description": f"Sustained high rate: {window_kbps:.1f} kbps over {self.file_transfer_window_sec}s"
+        }
     
-    def _send_alert(self, session: Dict, heuristic_alert: Dict) -> Optional[Dict]:
-        """Send alert to backend API."""
+    def _send_alert(self, session: Dict, heuristic_alert: Dict):
+        """Queue an alert for the backend API."""
+        key = (session["session_id"], heuristic_alert["heuristic"])
+        with self._alerts_lock:
+            if key in self._pending_alerts:
+                return
+            self._pending_alerts.add(key)
+        
+        # Copy the last 20 samples, oldest first; the sender expands them
+        stats = session["stats"]
+        head = int(stats[STAT_SAMPLE_HEAD])
+        recent = range(head - min(int(stats[STAT_SAMPLE_COUNT]), 20), head)
+        sample_ts = np.take(session["sample_ts"], recent, mode="wrap")
+        sample_bytes = np.take(session["sample_bytes"], recent, mode="wrap")
+        # Sample timestamps are monotonic; report them as wall-clock time
+        timestamp = time.time()
+        now = time.clock_gettime(MONOTONIC_CLOCK)
+        sample_ts += timestamp - now
         alert_payload = {
             "session_id": session["session_id"],
             "client_ip": session["client_ip"],
             "upstream_ip": session["upstream_ip"],
-            "timestamp": time.time(),
+            "timestamp": timestamp,
             "heuristic": heuristic_alert["heuristic"],
             "bytes": heuristic_alert["bytes"],
-            "recent_samples": [
-                {
-                    "timestamp": s["timestamp"],
-                    "direction": s["direction"],
-                    "bytes": s["bytes"]
-                }
-                for s in list(session["recent_samples"])[-20:]  # Last 20 samples
-            ],
+            "recent_samples": [],
             "session_stats": {
-                "client_to_server_bytes": session["client_to_server_bytes"],
-                "server_to_client_bytes": session["server_to_client_bytes"],
-                "client_to_server_packets": session["client_to_server_packets"],
-                "server_to_client_packets": session["server_to_client_packets"],
-                "duration_seconds": time.time() - session["start_time"]
+                "client_to_server_bytes": int(stats[STAT_C2S_BYTES]),
+                "server_to_client_bytes": int(stats[STAT_S2C_BYTES]),
+                "client_to_server_packets": int(stats[STAT_C2S_PACKETS]),
+                "server_to_client_packets": int(stats[STAT_S2C_PACKETS]),
+                "duration_seconds": now - float(self._start_time[session["idx"]])
             }
         }
         
+        self._alert_queue.put(
+            (session["session_id"], heuristic_alert["heuristic"], alert_payload, sample_ts, sample_bytes)
+        )
+    
+    def _flush_alert_log(self, log_fd: int, lines: List[bytes]):
+        """Append buffered alert lines with a single writev and sync them."""
         try:
-            response = requests.post(
-                self.alert_url,
-                json=alert_payload,
-                timeout=5,
-                headers={"Content-Type": "application/json"}
-            )
-            response.raise_for_status()
+            os.writev(log_fd, lines)
+            os.fdatasync(log_fd)
+        except OSError as e:
+            self.logger.error(f"Failed to write alert log: {e}")
+    
+    def _alert_sender(self):
+        """Post queued alerts to the backend and apply containment decisions."""
+        http = requests.Session()
+        http.mount("http://", HTTPAdapter(pool_connections=16, pool_maxsize=64))
+        http.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=64))
+        
+        # Write-behind alert log; O_APPEND keeps lines from several workers intact
+        log_fd = None
+        if self.alert_log:
+            log_fd = os.open(self.alert_log, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        pending: List[bytes] = []
+        pending_bytes = 0
+        flush_at = 0.0
+        # Sessions contained here; their queued alerts are dropped until the close marker arrives
+        contained_ids = set()
+        
+        while True:
+            timeout = None
+            if pending:
+                timeout = flush_at - time.monotonic()
+                if timeout <= 0 or pending_bytes >= self.ALERT_LOG_BUFFER_BYTES:
+                    self._flush_alert_log(log_fd, pending)
+                    pending, pending_bytes = [], 0
+                    timeout = None
             
-            result = response.json()
-            self.logger.info(f"Alert sent for session {session['session_id']}: {heuristic_alert['heuristic']}")
+            try:
+                item = self._alert_queue.get(timeout=timeout)
+            except queue.Empty:
+                continue
+            session_id, heuristic, alert_payload, sample_ts, sample_bytes = item
+            if heuristic is None:
+                # Session closed; nothing queued after this belongs to it
+                contained_ids.discard(session_id)
+                continue
             
-            # Check if backend wants containment
-            if result.get("action") == "contain" or self.contain_on_alert:
-                return {"action": "contain"}
+            with self._alerts_lock:
+                self._pending_alerts.discard((session_id, heuristic))
             
-            return result
+            session = self.sessions.get(session_id)
+            if session_id in contained_ids or (session is not None and self._contained[session["idx"]]):
+                continue
             
-        except requests.exceptions.RequestException as e:
-            self.logger.error(f"Failed to send alert: {e}")
-            return None
+            alert_payload["recent_samples"] = [
+                {
+                    "timestamp": ts,
+                    "direction": "client_to_server" if size > 0 else "server_to_client",
+                    "bytes": abs(size)
+                }
+                for ts, size in zip(sample_ts.tolist(), sample_bytes.tolist())
+            ]
+            body = orjson.dumps(alert_payload, option=orjson.OPT_SERIALIZE_NUMPY)
+            
+            if log_fd is not None:
+                if not pending:
+                    flush_at = time.monotonic() + self.ALERT_LOG_FLUSH_SEC
+                pending.append(body + b"\n")
+                pending_bytes += len(body) + 1
+            
+            try:
+                response = http.post(
+                    self.alert_url,
+                    data=body,
+                    timeout=5,
+                    headers={"Content-Type": "application/json"}
+                )
+                response.raise_for_status()
+                
+                result = response.json()
+                self.logger.info(f"Alert sent for session {session_id}: {heuristic}")
+                
+                # Contain if the backend asks for it; the forwarder closes the session
+                if session is not None and (result.get("action") == "contain" or self.contain_on_alert):
+                    self.logger.critical(f"CONTAINING session {session_id}")
+                    contained_ids.add(session_id)
+                    self._contain(session)
+            
+            except requests.exceptions.RequestException as e:
+                self.logger.error(f"Failed to send alert: {e}")
+    
+    def _splice_chunk(self, source: socket.socket, dest: socket.socket, pipe_r: int, pipe_w: int) -> int:
+        """Move one chunk from source to dest through a kernel pipe, without copying it into Python."""
+        data_size = os.splice(source.fileno(), pipe_w, self.RECV_BUFFER_SIZE)
+        remaining = data_size
+        while remaining:
+            try:
+                remaining -= os.splice(pipe_r, dest.fileno(), remaining)
+            except BlockingIOError:
+                # Sockets with a timeout are non-blocking underneath; wait like sendall would
+                if not select.select([], [dest], [], dest.gettimeout())[1]:
+                    raise socket.timeout("timed out")
+        return data_size
+    
+    def _forward_session(self, session: Dict, client_socket: socket.socket, server_socket: socket.socket):
+        """
+        Forward data in both directions and monitor for heuristics.
+        One readiness loop serves both sockets, so a session costs a single thread.
+        """
+        session_id = session["session_id"]
+        direction = None
+        
+        # The heuristics only look at chunk sizes, so payloads can stay in the kernel
+        use_splice = hasattr(os, "splice")
+        if use_splice:
+            try:
+                pipe_r, pipe_w = self._pipe_pool.get_nowait()
+            except queue.Empty:
+                pipe_r, pipe_w = os.pipe()
+            c2s_buffer = s2c_buffer = None
+        else:
+            # One receive buffer per direction, reused for every recv on the session
+            c2s_buffer = memoryview(bytearray(self.RECV_BUFFER_SIZE))
+            s2c_buffer = memoryview(bytearray(self.RECV_BUFFER_SIZE))
+        
+        with selectors.DefaultSelector() as selector:
+            selector.register(client_socket, selectors.EVENT_READ, (server_socket, "client_to_server", c2s_buffer))
+            selector.register(server_socket, selectors.EVENT_READ, (client_socket, "server_to_client", s2c_buffer))
+            # Containment only arrives through the wakeup socket, so reads need no flag check
+            selector.register(session["wakeup_r"], selectors.EVENT_READ, None)
+            
+            try:
+                while True:
+                    for key, _ in selector.select():
+                        if key.data is None:
+                            self.logger.critical(f"Closing contained session {session_id}")
+                            return
+                        source = key.fileobj
+                        dest, direction, buffer = key.data
+                        
+                        # Forward data
+                        if use_splice:
+                            data_size = self._splice_chunk(source, dest, pipe_r, pipe_w)
+                            if not data_size:
+                                return
+                        else:
+                            data_size = source.recv_into(buffer)
+                            if not data_size:
+                                return
+                            dest.sendall(buffer[:data_size])
+                        
+                        # Check heuristics
+                        heuristic_alert = self._check_heuristics(session, direction, data_size)
+                        
+                        if heuristic_alert:
+                            self.logger.warning(
+                                f"Heuristic triggered in {session_id}: {heuristic_alert['heuristic']}"
+                            )
+                            
+                            # Send alert
+                            self._send_alert(session, heuristic_alert)
+                        
+            except (socket.error, OSError) as e:
+                self.logger.debug(f"Connection closed in {direction} direction: {e}")
+                if use_splice:
+                    # A failed transfer can leave bytes in the pipe, so it is not reused
+                    os.close(pipe_r)
+                    os.close(pipe_w)
+                    use_splice = False
+            finally:
+                if use_splice:
+                    self._pipe_pool.put((pipe_r, pipe_w))
     
     def _handle_client(self, client_socket: socket.socket, client_addr: Tuple[str, int]):
         """Handle a single client connection."""
         session_id = self._generate_session_id(client_addr)
         session = self._create_session(session_id, client_addr)
+        if session is None:
+            self.logger.warning(f"Session limit ({self.max_sessions}) reached, rejecting {client_addr}")
+            client_socket.close()
+            return
         
         self.logger.info(f"New session: {session_id} from {client_addr}")
         
         try:
+            client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            
             # Connect to upstream VNC server
             server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            server_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.SOCKET_RCVBUF)
             server_socket.settimeout(30)
             server_socket.connect((self.server_host, self.server_port))
             self.logger.info(f"Connected to upstream server {self.server_host}:{self.server_port}")
             
             # Check if session is already contained
-            if session_id in self.contained_sessions:
+            if self._contained[session["idx"]]:
                 self.logger.warning(f"Session {session_id} is contained, closing connection")
                 client_socket.close()
                 server_socket.close()
                 return
             
-            # Start bidirectional forwarding
-            def forward_data(source: socket.socket, dest: socket.socket, direction: str):
-                """Forward data and monitor for heuristics."""
-                try:
-                    while True:
-                        data = source.recv(4096)
-                        if not data:
-                            break
-                        
-                        # Check heuristics
-                        if session_id not in self.contained_sessions:
-                            heuristic_alert = self._check_heuristics(session, direction, len(data))
-                            
-                            if heuristic_alert:
-                                self.logger.warning(
-                                    f"Heuristic triggered in {session_id}: {heuristic_alert['heuristic']}"
-                                )
-                                
-                                # Send alert
-                                result = self._send_alert(session, heuristic_alert)
-                                
-                                # Contain if requested
-                                if result and result.get("action") == "contain":
-                                    self.logger.critical(f"CONTAINING session {session_id}")
-                                    self.contained_sessions.add(session_id)
-                                    break
-                        
-                        # Forward data
-                        dest.sendall(data)
-                        
-                except (socket.error, OSError) as e:
-                    self.logger.debug(f"Connection closed in {direction} direction: {e}")
-                finally:
-                    try:
-                        source.close()
-                        dest.close()
-                    except:
-                        pass
-            
-            # Start forwarding threads
-            client_to_server_thread = threading.Thread(
-                target=forward_data,
-                args=(client_socket, server_socket, "client_to_server"),
-                daemon=True
-            )
-            server_to_client_thread = threading.Thread(
-                target=forward_data,
-                args=(server_socket, client_socket, "server_to_client"),
-                daemon=True
-            )
-            
-            client_to_server_thread.start()
-            server_to_client_thread.start()
-            
-            # Wait for threads to complete
-            client_to_server_thread.join()
-            server_to_client_thread.join()
+            # Forward both directions from this thread
+            self._forward_session(session, client_socket, server_socket)
             
         except socket.error as e:
             self.logger.error(f"Socket error in session {session_id}: {e}")
@@ -299,45 +577,91 @@ class VNCProxy:
             except:
                 pass
             
-            if session_id in self.sessions:
-                del self.sessions[session_id]
+            self._release_session(session)
             
             self.logger.info(f"Session {session_id} closed")
     
     def contain_session(self, session_id: str) -> bool:
         """Manually contain a session (called by backend)."""
-        if session_id in self.sessions:
-            self.contained_sessions.add(session_id)
+        session = self.sessions.get(session_id)
+        if session is not None:
+            self._contain(session)
             self.logger.info(f"Session {session_id} manually contained")
             return True
         return False
     
-    def start(self):
-        """Start the proxy server."""
+    def _create_listener(self) -> socket.socket:
+        """Create the listening socket, shared across workers via SO_REUSEPORT."""
         server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if self.workers > 1:
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        # Set before listen so accepted sockets inherit it and can use a large window
+        server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self.SOCKET_RCVBUF)
         server_socket.bind((self.listen_host, self.listen_port))
-        server_socket.listen(10)
-        
+        server_socket.listen(socket.SOMAXCONN)
+        server_socket.setblocking(False)
+        return server_socket
+    
+    def _serve(self):
+        """Accept loop for a single worker."""
+        server_socket = self._create_listener()
+        threading.Thread(target=self._alert_sender, daemon=True).start()
+        selector = selectors.DefaultSelector()
+        selector.register(server_socket, selectors.EVENT_READ)
+        try:
+            while True:
+                selector.select()
+                # Drain every pending connection per wakeup
+                while True:
+                    try:
+                        client_socket, client_addr = server_socket.accept()
+                    except BlockingIOError:
+                        break
+                    client_thread = threading.Thread(
+                        target=self._handle_client,
+                        args=(client_socket, client_addr),
+                        daemon=True
+                    )
+                    client_thread.start()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            selector.close()
+            server_socket.close()
+    
+    def start(self):
+        """Start the proxy server."""
         self.logger.info(
-            f"SentinelVNC Proxy listening on {self.listen_host}:{self.listen_port}"
+            f"SentinelVNC Proxy listening on {self.listen_host}:{self.listen_port} "
+            f"({self.workers} worker(s))"
         )
         self.logger.info(f"Forwarding to {self.server_host}:{self.server_port}")
         self.logger.info(f"Alert URL: {self.alert_url}")
         
+        if self.workers == 1:
+            self._serve()
+            self.logger.info("Shutting down proxy...")
+            return
+        
+        # The kernel load-balances accepts across the workers' listeners;
+        # sessions never migrate, so per-process session dicts need no locking.
+        # Fork explicitly: the proxy holds locks and queues that spawn cannot pickle,
+        # and no threads have started yet in this process
+        fork = multiprocessing.get_context("fork")
+        processes = [
+            fork.Process(target=self._serve, daemon=True)
+            for _ in range(self.workers)
+        ]
+        for process in processes:
+            process.start()
         try:
-            while True:
-                client_socket, client_addr = server_socket.accept()
-                client_thread = threading.Thread(
-                    target=self._handle_client,
-                    args=(client_socket, client_addr),
-                    daemon=True
-                )
-                client_thread.start()
+            for process in processes:
+                process.join()
         except KeyboardInterrupt:
             self.logger.info("Shutting down proxy...")
-        finally:
-            server_socket.close()
+            for process in processes:
+                process.terminate()
 
 
 def main():
@@ -350,6 +674,9 @@ def main():
     parser.add_argument("--clipboard-threshold-kb", type=int, default=200, help="Clipboard threshold in KB")
     parser.add_argument("--frameburst-threshold-mb", type=int, default=10, help="Frameburst threshold in MB")
     parser.add_argument("--file-transfer-rate-kbps", type=int, default=1000, help="File transfer rate threshold in kbps")
+    parser.add_argument("--alert-log", default=None, help="Also append alerts to this JSONL file")
+    parser.add_argument("--max-sessions", type=int, default=1024, help="Maximum concurrent sessions per worker")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes sharing the listen port (0 = one per CPU)")
     
     args = parser.parse_args()
     
@@ -371,7 +698,10 @@ def main():
         contain_on_alert=args.contain_on_alert,
         clipboard_threshold_kb=args.clipboard_threshold_kb,
         frameburst_threshold_bytes=args.frameburst_threshold_mb * 1024 * 1024,
-        file_transfer_rate_threshold_kbps=args.file_transfer_rate_kbps
+        file_transfer_rate_threshold_kbps=args.file_transfer_rate_kbps,
+        workers=args.workers,
+        max_sessions=args.max_sessions,
+        alert_log=args.alert_log
     )
     
     proxy.start()
@@ -5,10 +5,12 @@ Real-time monitoring dashboard for VNC data exfiltration detection.
 """
 
 import streamlit as st
-import json
+import os
+import threading
 import time
 from pathlib import Path
 from datetime import datetime
+import orjson
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
@@ -55,62 +57,96 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-@st.cache_data(ttl=1)
+def _parse_alert_lines(data: bytes) -> pd.DataFrame:
+    """Parse a block of JSONL alerts, skipping malformed lines."""
+    alerts = []
+    for line in data.splitlines():
+        try:
+            alerts.append(orjson.loads(line))
+        except orjson.JSONDecodeError:
+            continue
+    return pd.DataFrame(alerts)
+
+
+@st.cache_resource
+def _alert_tail(alerts_file: Path) -> dict:
+    """Parsed alerts plus the file offset they cover, kept across reruns."""
+    return {"lock": threading.Lock(), "offset": 0, "df": pd.DataFrame()}
+
+
 def load_alerts(alerts_file: Path) -> pd.DataFrame:
-    """Load alerts from JSONL file."""
+    """Load alerts from JSONL file, parsing only lines appended since the last call."""
     if not alerts_file.exists():
         return pd.DataFrame()
     
-    alerts = []
-    with open(alerts_file, 'r') as f:
-        for line in f:
+    tail = _alert_tail(alerts_file)
+    with tail["lock"]:
+        size = alerts_file.stat().st_size
+        if size < tail["offset"]:
+            # File was truncated or rotated; start over
+            tail["offset"] = 0
+            tail["df"] = pd.DataFrame()
+        
+        if size > tail["offset"]:
+            with open(alerts_file, 'rb') as f:
+                f.seek(tail["offset"])
+                data = f.read(size - tail["offset"])
+            # Leave a partially written last line for the next call
+            data = data[:data.rfind(b"\n") + 1]
+            if data.strip():
+                new_alerts = _parse_alert_lines(data)
+                if not new_alerts.empty:
+                    new_alerts['datetime'] = pd.to_datetime(new_alerts['timestamp'], unit='s')
+                    tail["df"] = pd.concat([tail["df"], new_alerts], ignore_index=True)
+            tail["offset"] += len(data)
+        
+        # Callers add columns, so hand out a shallow copy
+        return tail["df"].copy(deep=False)
+
+
+@st.cache_resource
+def _json_dir_cache(directory: Path) -> dict:
+    """Parsed JSON files of a directory keyed by path, with the mtime they were read at."""
+    return {"lock": threading.Lock(), "files": {}}
+
+
+def _load_json_dir(directory: Path) -> list:
+    """Load every *.json file in a directory, re-parsing only files whose mtime changed."""
+    cache = _json_dir_cache(directory)
+    with cache["lock"]:
+        files = {}
+        for entry in os.scandir(directory):
+            if not entry.name.endswith(".json") or not entry.is_file():
+                continue
             try:
-                alert = json.loads(line.strip())
-                alerts.append(alert)
-            except json.JSONDecodeError:
+                mtime = entry.stat().st_mtime_ns
+                cached = cache["files"].get(entry.path)
+                if cached is None or cached[0] != mtime:
+                    with open(entry.path, 'rb') as f:
+                        cached = (mtime, orjson.loads(f.read()))
+            except (OSError, ValueError):
                 continue
-    
-    if not alerts:
-        return pd.DataFrame()
-    
-    df = pd.DataFrame(alerts)
-    df['datetime'] = pd.to_datetime(df['timestamp'], unit='s')
-    return df
+            files[entry.path] = cached
+        
+        # Dropping unseen paths forgets deleted files
+        cache["files"] = files
+        return [data for _, data in files.values()]
 
 
-@st.cache_data(ttl=1)
 def load_forensic(forensic_dir: Path) -> list:
     """Load forensic files."""
     if not forensic_dir.exists():
         return []
     
-    forensic_files = []
-    for f in forensic_dir.glob("*.json"):
-        try:
-            with open(f, 'r') as f:
-                forensic = json.load(f)
-                forensic_files.append(forensic)
-        except:
-            continue
-    
-    return forensic_files
+    return _load_json_dir(forensic_dir)
 
 
-@st.cache_data(ttl=1)
 def load_anchors(anchors_dir: Path) -> list:
     """Load anchor files."""
     if not anchors_dir.exists():
         return []
     
-    anchors = []
-    for f in anchors_dir.glob("*.json"):
-        try:
-            with open(f, 'r') as f:
-                anchor = json.load(f)
-                anchors.append(anchor)
-        except:
-            continue
-    
+    anchors = _load_json_dir(anchors_dir)
     return sorted(anchors, key=lambda x: x.get("timestamp", 0), reverse=True)
 
 
@@ -1,20 +1,48 @@
 """
 Pytest configuration and fixtures for SentinelVNC tests.
 """
+import os
 import pytest
 import tempfile
 import shutil
 from pathlib import Path
 import json
 import time
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from attack_simulator import AttackSimulator
+
+# Fixed training data for dummy models (11 features)
+_RNG = np.random.default_rng(42)
+_X_DUMMY = _RNG.random((100, 11))
+_Y_DUMMY = np.tile([0, 1], 50).astype(np.uint8)  # Labels only need both classes present
+
+
+# RAM-backed tmpfs keeps the write-and-read-back tests off the disk when available
+_TMPFS_DIR = "/dev/shm" if Path("/dev/shm").is_dir() and os.access("/dev/shm", os.W_OK) else None
 
 
 @pytest.fixture
 def temp_dir():
     """Create a temporary directory for tests."""
-    temp_path = tempfile.mkdtemp()
+    temp_path = tempfile.mkdtemp(dir=_TMPFS_DIR)
     yield Path(temp_path)
-    shutil.rmtree(temp_path)
+    shutil.rmtree(temp_path, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def shared_rf_model_bytes(tmp_path_factory):
+    """Dummy detection model bundle, trained and pickled once per test session."""
+    model = RandomForestClassifier(n_estimators=1, max_depth=3, random_state=42, n_jobs=1)
+    model.fit(_X_DUMMY, _Y_DUMMY)
+    
+    model_path = tmp_path_factory.mktemp("shared_model") / "detection_model.pkl"
+    joblib.dump({
+        "model": model,
+        "feature_names": [f"feature_{i}" for i in range(11)]
+    }, model_path)
+    return model_path.read_bytes()
 
 
 @pytest.fixture
@@ -100,6 +128,21 @@ def model_dir(temp_dir):
     return model_dir
 
 
+@pytest.fixture(autouse=True)
+def fast_screenshots(monkeypatch):
+    """Write empty placeholder files instead of rendering real screenshots."""
+    monkeypatch.setattr(
+        AttackSimulator, "_write_screenshot",
+        lambda self, screenshot_path, timestamp: screenshot_path.touch()
+    )
+
+
+@pytest.fixture
+def sim(temp_dir):
+    """AttackSimulator writing into the test's temporary directory."""
+    return AttackSimulator(output_dir=str(temp_dir / "data" / "synthetic"))
+
+
 @pytest.fixture
 def alerts_file(temp_dir):
     """Create a temporary alerts file."""
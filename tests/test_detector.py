@@ -4,11 +4,11 @@ Unit tests for detector.py
 import pytest
 import json
 import time
-import joblib
 from pathlib import Path
-from detector import RuleBasedDetector, MLDetector, HybridDetector
-from sklearn.ensemble import RandomForestClassifier
+from unittest.mock import MagicMock
+from detector import RuleBasedDetector, MLDetector, HybridDetector, EventWindow
 import numpy as np
+import pandas as pd
 
 
 class TestRuleBasedDetector:
@@ -108,6 +108,23 @@ class TestRuleBasedDetector:
         assert triggered is True
         assert "rapid" in reason.lower() or "2" in reason
     
+    def test_check_file_transfer_rule_window_slides(self):
+        """Test transfers outside the window drop out of the running total."""
+        detector = RuleBasedDetector()
+        base_time = time.time()
+        
+        for offset, size_mb in [(0.0, 40.0), (60.0, 10.0), (65.0, 20.0)]:
+            event = {
+                "event_type": "file_transfer",
+                "timestamp": base_time + offset,
+                "size_mb": size_mb
+            }
+            triggered, reason = detector.check_file_transfer_rule(event)
+        
+        assert triggered is True
+        assert "2 files (30.0MB total)" in reason
+        assert len(detector.file_transfer_history) == 2
+    
     def test_evaluate_rules_multiple_triggers(self):
         """Test evaluate_rules with multiple rule triggers."""
         detector = RuleBasedDetector()
@@ -121,6 +138,28 @@ class TestRuleBasedDetector:
         assert is_alert is True
         assert len(reasons) > 0
         assert any("Rule 1" in r for r in reasons)
+    
+    def test_evaluate_batch_matches_evaluate_rules(self):
+        """Test batch replay flags the same events and rules as per-event evaluation."""
+        base_time = 1000.0
+        events = [{"event_type": "clipboard_copy", "timestamp": base_time, "size_kb": 300}]
+        events += [{"event_type": "screenshot", "timestamp": base_time + i} for i in range(6)]
+        events += [
+            {"event_type": "file_transfer", "timestamp": base_time + 10, "size_mb": 30.0},
+            {"event_type": "file_transfer", "timestamp": base_time + 20, "size_mb": 30.0},
+            {"event_type": "file_transfer", "timestamp": base_time + 100, "size_mb": 80.0},
+        ]
+        
+        detector = RuleBasedDetector()
+        expected = []
+        for idx, event in enumerate(events):
+            _, reasons = detector.evaluate_rules(event)
+            expected.extend((idx, int(r[5])) for r in reasons)
+        
+        alerts = RuleBasedDetector().evaluate_batch(pd.DataFrame(events))
+        
+        assert list(zip(alerts["alert_idx"], alerts["rule_id"])) == expected
+        assert "2 files (60.0MB total)" in alerts["reason"].iloc[-2]
 
 
 class TestMLDetector:
@@ -133,25 +172,15 @@ class TestMLDetector:
         
         assert detector.model is None
     
-    def test_init_with_model(self, temp_dir, model_dir):
+    def test_init_with_model(self, temp_dir, model_dir, shared_rf_model_bytes):
         """Test MLDetector initialization with model file."""
         model_path = model_dir / "detection_model.pkl"
-        
-        # Create a dummy model
-        model = RandomForestClassifier(n_estimators=10, random_state=42)
-        X_dummy = np.random.rand(100, 11)  # 11 features
-        y_dummy = np.random.randint(0, 2, 100)
-        model.fit(X_dummy, y_dummy)
-        
-        model_data = {
-            "model": model,
-            "feature_names": [f"feature_{i}" for i in range(11)]
-        }
-        joblib.dump(model_data, model_path)
+        model_path.write_bytes(shared_rf_model_bytes)
         
         detector = MLDetector(model_path=str(model_path))
         assert detector.model is not None
         assert len(detector.feature_names) == 11
+        assert set(detector.feature_importance) == {f"feature_{i}" for i in range(11)}
     
     def test_extract_features_clipboard(self):
         """Test feature extraction for clipboard event."""
@@ -172,9 +201,16 @@ class TestMLDetector:
         features = detector.extract_features(event, history_context)
         
         assert features.shape == (1, 11)
+        assert features.dtype == np.float32
         assert features[0][0] == 1.0  # is_clipboard
         assert features[0][1] == 0.0  # is_screenshot
         assert features[0][2] == 0.0  # is_file_transfer
+        
+        # Each call returns its own array
+        other = detector.extract_features({"event_type": "screenshot", "timestamp": time.time()}, {})
+        assert other is not features
+        assert features[0][0] == 1.0
+        assert other[0][1] == 1.0
     
     def test_predict_no_model(self):
         """Test predict when model is not loaded."""
@@ -187,21 +223,10 @@ class TestMLDetector:
         assert score == 0.0
         assert "error" in info
     
-    def test_predict_with_model(self, model_dir):
+    def test_predict_with_model(self, model_dir, shared_rf_model_bytes):
         """Test predict with loaded model."""
         model_path = model_dir / "detection_model.pkl"
-        
-        # Create and save model
-        model = RandomForestClassifier(n_estimators=10, random_state=42)
-        X_dummy = np.random.rand(100, 11)
-        y_dummy = np.random.randint(0, 2, 100)
-        model.fit(X_dummy, y_dummy)
-        
-        model_data = {
-            "model": model,
-            "feature_names": [f"feature_{i}" for i in range(11)]
-        }
-        joblib.dump(model_data, model_path)
+        model_path.write_bytes(shared_rf_model_bytes)
         
         detector = MLDetector(model_path=str(model_path))
         event = {
@@ -221,6 +246,48 @@ class TestMLDetector:
         
         assert 0.0 <= score <= 1.0
         assert "anomaly_score" in info or "error" in info
+    
+    def test_predict_batch_matches_predict(self, model_dir, shared_rf_model_bytes):
+        """Test batched scores match single-event predictions."""
+        model_path = model_dir / "detection_model.pkl"
+        model_path.write_bytes(shared_rf_model_bytes)
+        
+        detector = MLDetector(model_path=str(model_path))
+        events = [
+            {"event_type": "clipboard_copy", "size_kb": 250, "timestamp": 1000.0},
+            {"event_type": "file_transfer", "size_mb": 40, "timestamp": 1005.0},
+            {"event_type": "screenshot", "timestamp": 1010.0},
+        ]
+        contexts = [{"clipboard_count_1min": i} for i in range(3)]
+        
+        scores, infos = detector.predict_batch(events, contexts)
+        
+        assert scores.shape == (3,)
+        for event, context, score, info in zip(events, contexts, scores, infos):
+            single_score, _ = detector.predict(event, context)
+            assert single_score == pytest.approx(float(score))
+            assert info["anomaly_score"] == pytest.approx(float(score))
+    
+    def test_predict_batch_onnx_matches_sklearn(self, model_dir, shared_rf_model_bytes):
+        """Test the ONNX scoring path agrees with sklearn predict_proba."""
+        pytest.importorskip("onnxruntime")
+        pytest.importorskip("skl2onnx")
+        from scripts.compile_model import compile_model
+        
+        model_path = model_dir / "detection_model.pkl"
+        model_path.write_bytes(shared_rf_model_bytes)
+        compile_model(model_path)
+        
+        detector = MLDetector(model_path=str(model_path))
+        assert detector.onnx_session is not None
+        events = [{"event_type": "clipboard_copy", "size_kb": 10 * i, "timestamp": 1000.0 + i} for i in range(20)]
+        contexts = [{"clipboard_count_1min": i % 5} for i in range(20)]
+        
+        onnx_scores, _ = detector.predict_batch(events, contexts)
+        detector.onnx_session = None
+        sklearn_scores, _ = detector.predict_batch(events, contexts)
+        
+        assert np.allclose(onnx_scores, sklearn_scores, atol=1e-5)
 
 
 class TestHybridDetector:
@@ -260,6 +327,21 @@ class TestHybridDetector:
         assert "clipboard_count_1min" in context
         assert context["clipboard_count_1min"] == 5
     
+    def test_history_window_wraps(self):
+        """Test the history ring overwrites its oldest events."""
+        window = EventWindow(capacity=3)
+        current_time = time.time()
+        
+        for i in range(5):
+            window.append({
+                "event_type": "file_transfer",
+                "timestamp": current_time + i,
+                "size_mb": 10.0 * (i + 1)
+            })
+        
+        assert len(window) == 3
+        assert sorted(window.sizes_mb.tolist()) == [30.0, 40.0, 50.0]
+    
     def test_process_event_rule_alert(self, temp_dir):
         """Test process_event with rule-based alert."""
         detector = HybridDetector(
@@ -280,6 +362,30 @@ class TestHybridDetector:
         assert "rule_based" in alert["detection_methods"]
         assert len(alert["reasons"]) > 0
     
+    def test_process_event_fast_path_skips_ml(self, temp_dir):
+        """Test rule alerts skip ML scoring when the fast path is enabled."""
+        detector = HybridDetector(
+            events_file=str(temp_dir / "events.jsonl"),
+            model_path=str(temp_dir / "models" / "detection_model.pkl"),
+            fast_path_on_rule_alert=True
+        )
+        detector.ml_detector.predict = MagicMock(side_effect=AssertionError("ML should be skipped"))
+        detector.ml_detector.predict_batch = MagicMock(return_value=(np.zeros(1), [{}]))
+        
+        event = {"event_type": "clipboard_copy", "timestamp": time.time(), "size_kb": 300}
+        alert = detector.process_event(event)
+        
+        assert alert["detection_methods"] == ["rule_based"]
+        assert alert["ml_info"] == {"skipped": True}
+        
+        # Batch path only scores the events no rule flagged
+        normal = {"event_type": "clipboard_copy", "timestamp": time.time(), "size_kb": 50}
+        alerts = detector.process_events([dict(event), normal])
+        
+        assert alerts[0]["ml_info"] == {"skipped": True}
+        assert alerts[1] is None
+        assert detector.ml_detector.predict_batch.call_args[0][0] == [normal]
+    
     def test_process_event_no_alert(self, temp_dir):
         """Test process_event with no alert."""
         detector = HybridDetector(
@@ -366,3 +472,65 @@ class TestHybridDetector:
                 alerts = [json.loads(line) for line in f]
                 assert len(alerts) > 0
 
+    
+    def test_poll_events_reads_only_appended_lines(self, temp_dir, events_file):
+        """Test repeated polls only process lines appended since the last poll."""
+        detector = HybridDetector(
+            events_file=str(events_file),
+            model_path=str(temp_dir / "models" / "detection_model.pkl")
+        )
+        detector.alerts_file = temp_dir / "logs" / "alerts.jsonl"
+        detector.alerts_file.parent.mkdir(parents=True, exist_ok=True)
+        detector.forensic_dir = temp_dir / "forensic"
+        detector.forensic_dir.mkdir(parents=True, exist_ok=True)
+        
+        event = {
+            "event_type": "clipboard_copy",
+            "timestamp": time.time(),
+            "size_kb": 300  # Triggers alert
+        }
+        with open(events_file, 'w') as f:
+            f.write(json.dumps(event) + '\n')
+        detector.poll_events(continuous=False)
+        
+        with open(events_file, 'a') as f:
+            f.write(json.dumps(event) + '\n')
+        detector.poll_events(continuous=False)
+        detector.close()
+        
+        with open(detector.alerts_file, 'r') as f:
+            alerts = [json.loads(line) for line in f if line.strip()]
+        assert len(alerts) == 2
+    
+    def test_poll_events_follows_rotated_file(self, temp_dir, events_file):
+        """Test a poll after rename rotation finishes the old file and reads the new one."""
+        detector = HybridDetector(
+            events_file=str(events_file),
+            model_path=str(temp_dir / "models" / "detection_model.pkl")
+        )
+        detector.alerts_file = temp_dir / "logs" / "alerts.jsonl"
+        detector.alerts_file.parent.mkdir(parents=True, exist_ok=True)
+        detector.forensic_dir = temp_dir / "forensic"
+        detector.forensic_dir.mkdir(parents=True, exist_ok=True)
+        
+        event = {
+            "event_type": "clipboard_copy",
+            "timestamp": time.time(),
+            "size_kb": 300  # Triggers alert
+        }
+        with open(events_file, 'w') as f:
+            f.write(json.dumps(event) + '\n')
+        detector.poll_events(continuous=False)
+        
+        # Written before the rename, so only the old inode holds it
+        with open(events_file, 'a') as f:
+            f.write(json.dumps(event) + '\n')
+        events_file.rename(events_file.with_suffix(".1"))
+        with open(events_file, 'w') as f:
+            f.write(json.dumps(event) + '\n')
+        detector.poll_events(continuous=False)
+        detector.close()
+        
+        with open(detector.alerts_file, 'r') as f:
+            alerts = [json.loads(line) for line in f if line.strip()]
+        assert len(alerts) == 3
@@ -4,20 +4,17 @@ Integration tests for SentinelVNC end-to-end workflows.
 import pytest
 import json
 import time
-import joblib
 from pathlib import Path
 from attack_simulator import AttackSimulator
 from detector import HybridDetector
 from merkle_anchor import ForensicAnchoring
 from train_model import train_model
-import numpy as np
-from sklearn.ensemble import RandomForestClassifier
 
 
 class TestEndToEndWorkflow:
     """Test complete end-to-end workflows."""
     
-    def test_full_detection_workflow(self, temp_dir):
+    def test_full_detection_workflow(self, temp_dir, shared_rf_model_bytes):
         """Test complete detection workflow: simulate -> detect -> anchor."""
         # Setup directories
         data_dir = temp_dir / "data" / "synthetic"
@@ -31,16 +28,7 @@ class TestEndToEndWorkflow:
         
         # Step 1: Create a simple model
         model_path = models_dir / "detection_model.pkl"
-        model = RandomForestClassifier(n_estimators=10, random_state=42)
-        X_dummy = np.random.rand(100, 11)
-        y_dummy = np.random.randint(0, 2, 100)
-        model.fit(X_dummy, y_dummy)
-        
-        model_data = {
-            "model": model,
-            "feature_names": [f"feature_{i}" for i in range(11)]
-        }
-        joblib.dump(model_data, model_path)
+        model_path.write_bytes(shared_rf_model_bytes)
         
         # Step 2: Simulate attacks
         sim = AttackSimulator(output_dir=str(data_dir))
@@ -83,7 +71,7 @@ class TestEndToEndWorkflow:
         anchor_file = anchors_dir / f"{anchor['anchor_id']}.json"
         assert anchorer.verify_anchor(anchor_file) is True
     
-    def test_detection_with_multiple_event_types(self, temp_dir):
+    def test_detection_with_multiple_event_types(self, temp_dir, shared_rf_model_bytes):
         """Test detection with multiple event types."""
         # Setup
         data_dir = temp_dir / "data" / "synthetic"
@@ -96,16 +84,7 @@ class TestEndToEndWorkflow:
         
         # Create model
         model_path = models_dir / "detection_model.pkl"
-        model = RandomForestClassifier(n_estimators=10, random_state=42)
-        X_dummy = np.random.rand(100, 11)
-        y_dummy = np.random.randint(0, 2, 100)
-        model.fit(X_dummy, y_dummy)
-        
-        model_data = {
-            "model": model,
-            "feature_names": [f"feature_{i}" for i in range(11)]
-        }
-        joblib.dump(model_data, model_path)
+        model_path.write_bytes(shared_rf_model_bytes)
         
         # Simulate mixed attacks
         sim = AttackSimulator(output_dir=str(data_dir))
@@ -133,8 +112,8 @@ class TestEndToEndWorkflow:
         assert len(alerts) > 0
         
         # Check that different event types triggered alerts
-        event_types = [alert["event"]["event_type"] for alert in alerts]
-        assert "clipboard_copy" in event_types or "screenshot" in event_types or "file_transfer" in event_types
+        event_types = {alert["event"]["event_type"] for alert in alerts}
+        assert event_types & {"clipboard_copy", "screenshot", "file_transfer"}
     
     def test_rule_based_detection_only(self, temp_dir):
         """Test detection works even without ML model."""
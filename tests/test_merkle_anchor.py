@@ -3,9 +3,20 @@ Unit tests for merkle_anchor.py
 """
 import pytest
 import json
+import os
 import time
 from pathlib import Path
-from merkle_anchor import MerkleTree, ForensicAnchoring
+from datetime import datetime
+from merkle_anchor import HASH_SCHEME, MerkleTree, ForensicAnchoring, iso_timestamp
+
+
+class TestIsoTimestamp:
+    """Test iso_timestamp helper."""
+    
+    def test_matches_datetime_isoformat(self):
+        """Test cached ISO formatting matches datetime.isoformat."""
+        for ts in [1700000000, 1700000000.5, 1700000000.9999996, 1700000001.000001]:
+            assert iso_timestamp(ts) == datetime.fromtimestamp(ts).isoformat()
 
 
 class TestMerkleTree:
@@ -53,6 +64,33 @@ class TestMerkleTree:
         # Should duplicate last hash to make even
         assert len(tree["tree"]["leaves"]) >= 3
     
+    def test_build_tree_bytes_and_hex_leaves_agree(self):
+        """Test raw digest leaves and hex leaves produce the same root."""
+        hashes = [MerkleTree.hash_data(f"data{i}") for i in range(3)]
+        tree_hex = MerkleTree.build_tree(hashes)
+        tree_bytes = MerkleTree.build_tree([bytes.fromhex(h) for h in hashes])
+        
+        assert len(hashes) == 3  # Input list is not padded in place
+        assert tree_hex["root"] == tree_bytes["root"]
+        assert len(tree_hex["root"]) == 64
+    
+    def test_build_tree_parallel_levels_match(self, monkeypatch):
+        """Test threaded level hashing yields the same root as the serial path."""
+        hashes = [MerkleTree.hash_data(f"data{i}") for i in range(37)]
+        serial_root = MerkleTree.build_tree(hashes)["root"]
+        
+        monkeypatch.setattr(MerkleTree, "PARALLEL_MIN_PAIRS", 2)
+        assert MerkleTree.build_tree(hashes)["root"] == serial_root
+    
+    def test_frontier_root_matches_build_tree(self):
+        """Test folding leaves one at a time yields the build_tree root."""
+        frontier = []
+        for n in range(1, 40):
+            leaf = bytes.fromhex(MerkleTree.hash_data(f"data{n}"))
+            MerkleTree.fold_leaf(frontier, n - 1, leaf)
+            hashes = [MerkleTree.hash_data(f"data{i}") for i in range(1, n + 1)]
+            assert MerkleTree.frontier_root(frontier, n) == MerkleTree.build_tree(hashes)["root"]
+    
     def test_create_merkle_root_no_files(self, temp_dir):
         """Test create_merkle_root with no files."""
         forensic_files = []
@@ -97,6 +135,51 @@ class TestMerkleTree:
         root2 = MerkleTree.create_merkle_root(forensic_files)
         
         assert root1 == root2  # Same files produce same root
+    
+    def test_create_merkle_root_parallel_matches_serial(self, forensic_dir, monkeypatch):
+        """Test threaded file hashing yields the same root as the serial path."""
+        for i in range(7):
+            (forensic_dir / f"forensic_{i}.json").write_text(json.dumps({"forensic_id": f"FORENSIC_{i}"}))
+        forensic_files = list(forensic_dir.glob("*.json"))
+        serial_root = MerkleTree.create_merkle_root(forensic_files)
+        
+        monkeypatch.setattr(MerkleTree, "PARALLEL_MIN_FILES", 2)
+        monkeypatch.setattr("merkle_anchor.os.cpu_count", lambda: 3)
+        assert MerkleTree.create_merkle_root(forensic_files) == serial_root
+    
+    def test_file_hash_sidecar_matches_content(self, temp_dir, forensic_dir):
+        """Test the detector's .sha256 sidecar equals the reparsed content hash."""
+        from detector import HybridDetector
+        detector = HybridDetector(
+            events_file=str(temp_dir / "events.jsonl"),
+            model_path=str(temp_dir / "models" / "detection_model.pkl")
+        )
+        detector.forensic_dir = forensic_dir
+        detector.generate_forensic_json({
+            "alert_id": "ALERT_1",
+            "timestamp": 1700000000.5,
+            "event": {"event_type": "clipboard_copy", "size_kb": 300},
+            "detection_methods": ["rule_based"],
+            "reasons": ["Rule 1"],
+            "severity": "medium",
+            "ml_score": 0.25,
+            "ml_info": {}
+        })
+        forensic_file = forensic_dir / "ALERT_1.json"
+        
+        assert forensic_file.with_suffix(".sha256").exists()
+        assert MerkleTree.file_hash(forensic_file) == MerkleTree.file_hash(forensic_file, use_sidecar=False)
+    
+    def test_file_hash_cache_invalidated_by_rewrite(self, forensic_dir, monkeypatch):
+        """Test a cached content hash is not reused after the file is rewritten."""
+        monkeypatch.setattr(MerkleTree, "HASH_CACHE_MIN_AGE_NS", -1)
+        forensic_file = forensic_dir / "forensic_0.json"
+        forensic_file.write_text(json.dumps({"forensic_id": "FORENSIC_0"}))
+        original = MerkleTree.file_hash(forensic_file, use_sidecar=False)
+        assert MerkleTree.file_hash(forensic_file, use_sidecar=False) == original
+        
+        forensic_file.write_text(json.dumps({"forensic_id": "TAMPERED_0"}))
+        assert MerkleTree.file_hash(forensic_file, use_sidecar=False) != original
 
 
 class TestForensicAnchoring:
@@ -150,6 +233,7 @@ class TestForensicAnchoring:
         assert "forensic_count" in anchor
         assert anchor["forensic_count"] == 3
         assert "signature_hash" in anchor
+        assert anchor["hash_scheme"] == HASH_SCHEME
         
         # Check anchor file was created
         anchor_file = anchors_dir / f"{anchor['anchor_id']}.json"
@@ -174,6 +258,49 @@ class TestForensicAnchoring:
         anchor_file = anchors_dir / "CUSTOM_ANCHOR_123.json"
         assert anchor_file.exists()
     
+    def test_create_anchor_incremental(self, temp_dir, forensic_dir, anchors_dir):
+        """Test later anchors fold in new files and match a full rebuild."""
+        anchorer = ForensicAnchoring(
+            forensic_dir=str(forensic_dir),
+            anchors_dir=str(anchors_dir)
+        )
+        
+        for i in range(3):
+            (forensic_dir / f"forensic_{i}.json").write_text(json.dumps({"forensic_id": f"FORENSIC_{i}"}))
+        first = anchorer.create_anchor(anchor_id="ANCHOR_1")
+        
+        for i in range(3, 5):
+            (forensic_dir / f"forensic_{i}.json").write_text(json.dumps({"forensic_id": f"FORENSIC_{i}"}))
+        # A fresh instance resumes from the persisted frontier
+        anchorer = ForensicAnchoring(
+            forensic_dir=str(forensic_dir),
+            anchors_dir=str(anchors_dir)
+        )
+        second = anchorer.create_anchor(anchor_id="ANCHOR_2")
+        
+        assert second["forensic_count"] == 5
+        assert second["merkle_root"] != first["merkle_root"]
+        assert second["merkle_root"] == MerkleTree.create_merkle_root(list(forensic_dir.glob("*.json")))
+        assert anchorer.verify_anchor(anchors_dir / "ANCHOR_2.json") is True
+        assert [a["anchor_id"] for a in anchorer.list_anchors()] == ["ANCHOR_1", "ANCHOR_2"]
+        
+        # Removing a folded file forces a rebuild
+        (forensic_dir / "forensic_0.json").unlink()
+        third = anchorer.create_anchor(anchor_id="ANCHOR_3")
+        assert third["merkle_root"] == MerkleTree.create_merkle_root(list(forensic_dir.glob("*.json")))
+        
+        # Rewriting a folded file in place forces a rebuild too, even at the same size and mtime
+        rewritten = forensic_dir / "forensic_1.json"
+        st = rewritten.stat()
+        rewritten.write_text(json.dumps({"forensic_id": "FORENSIC_X"}))
+        os.utime(rewritten, ns=(st.st_atime_ns, st.st_mtime_ns))
+        assert rewritten.stat().st_size == st.st_size
+        fourth = anchorer.create_anchor(anchor_id="ANCHOR_4")
+        assert fourth["merkle_root"] != third["merkle_root"]
+        assert fourth["merkle_root"] == MerkleTree.create_merkle_root(
+            list(forensic_dir.glob("*.json")), use_sidecars=False
+        )
+    
     def test_verify_anchor_valid(self, temp_dir, forensic_dir, anchors_dir):
         """Test verify_anchor with valid anchor."""
         anchorer = ForensicAnchoring(
@@ -227,6 +354,35 @@ class TestForensicAnchoring:
         
         assert result is False
     
+    def test_verify_anchor_legacy(self, temp_dir, forensic_dir, anchors_dir):
+        """Test verify_anchor with an anchor that predates hash_scheme."""
+        anchorer = ForensicAnchoring(
+            forensic_dir=str(forensic_dir),
+            anchors_dir=str(anchors_dir)
+        )
+        
+        leaves = []
+        for i in range(3):
+            data = {"forensic_id": f"FORENSIC_{i}", "timestamp": 1000 + i}
+            with open(forensic_dir / f"forensic_{i}.json", 'w') as f:
+                json.dump(data, f)
+            leaves.append(MerkleTree.hash_data(json.dumps(data, sort_keys=True)))
+        
+        # Legacy tree: duplicate the odd leaf, parents hash hex concatenations
+        leaves.append(leaves[-1])
+        left = MerkleTree.hash_data(leaves[0] + leaves[1])
+        right = MerkleTree.hash_data(leaves[2] + leaves[3])
+        anchor_file = anchors_dir / "ANCHOR_LEGACY.json"
+        with open(anchor_file, 'w') as f:
+            json.dump({
+                "anchor_id": "ANCHOR_LEGACY",
+                "merkle_root": MerkleTree.hash_data(left + right),
+                "file_count": 3,
+                "forensic_files": [f"forensic_{i}.json" for i in range(3)]
+            }, f)
+        
+        assert anchorer.verify_anchor(anchor_file) is True
+    
     def test_verify_anchor_nonexistent(self, temp_dir, anchors_dir):
         """Test verify_anchor with nonexistent file."""
         anchorer = ForensicAnchoring(
@@ -7,73 +7,80 @@ Trains a lightweight anomaly detection model with SHAP explainability.
 import numpy as np
 import pandas as pd
 from pathlib import Path
+from typing import List
 import joblib
-import json
+import orjson
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.model_selection import train_test_split
-from sklearn.metrics import classification_report, confusion_matrix
 import shap
 
 
 def generate_synthetic_dataset(n_samples: int = 1000) -> pd.DataFrame:
     """Generate synthetic training dataset."""
-    np.random.seed(42)
-    
-    data = []
-    
-    for i in range(n_samples):
-        # Random event type
-        event_type = np.random.choice(["clipboard_copy", "screenshot", "file_transfer"], 
-                                     p=[0.4, 0.3, 0.3])
-        
-        # Normal vs anomaly (80% normal, 20% anomaly)
-        is_anomaly = np.random.choice([0, 1], p=[0.8, 0.2])
-        
-        # Feature extraction (matching detector.py)
-        features = {}
-        features["is_clipboard"] = 1.0 if event_type == "clipboard_copy" else 0.0
-        features["is_screenshot"] = 1.0 if event_type == "screenshot" else 0.0
-        features["is_file_transfer"] = 1.0 if event_type == "file_transfer" else 0.0
-        
-        if event_type == "clipboard_copy":
-            if is_anomaly:
-                size_kb = np.random.uniform(200, 1000)  # Large clipboard
-            else:
-                size_kb = np.random.uniform(1, 100)  # Normal clipboard
-            features["clipboard_size_mb"] = size_kb / 1000.0
-            features["file_size_mb"] = 0.0
-        elif event_type == "file_transfer":
-            if is_anomaly:
-                size_mb = np.random.uniform(50, 500)  # Large file
-            else:
-                size_mb = np.random.uniform(1, 20)  # Normal file
-            features["clipboard_size_mb"] = 0.0
-            features["file_size_mb"] = size_mb
-        else:
-            features["clipboard_size_mb"] = 0.0
-            features["file_size_mb"] = 0.0
-        
+    rng = np.random.default_rng(42)
+    n = n_samples
+    
+    # Random event type (0 clipboard, 1 screenshot, 2 file transfer) at 40/30/30
+    event_type = np.digitize(rng.random(n), [0.4, 0.7])
+    
+    # Normal vs anomaly (80% normal, 20% anomaly)
+    anomaly = rng.random(n) < 0.2
+    is_anomaly = anomaly.astype(np.int64)
+    
+    def draw(normal_range, anomaly_range):
+        """Per-row uniform draw from the normal or anomaly range."""
+        return np.where(anomaly, rng.uniform(*anomaly_range, n), rng.uniform(*normal_range, n))
+    
+    is_clipboard = event_type == 0
+    is_file_transfer = event_type == 2
+    
+    # Feature extraction (matching detector.py)
+    features = {
+        "is_clipboard": is_clipboard,
+        "is_screenshot": event_type == 1,
+        "is_file_transfer": is_file_transfer,
+        # Large clipboard 200-1000KB vs normal 1-100KB; large file 50-500MB vs normal 1-20MB
+        "clipboard_size_mb": np.where(is_clipboard, draw((1, 100), (200, 1000)) / 1000.0, 0.0),
+        "file_size_mb": np.where(is_file_transfer, draw((1, 20), (50, 500)), 0.0),
         # Temporal features
-        features["time_of_day"] = np.random.uniform(0, 1)
-        
+        "time_of_day": rng.uniform(0, 1, n),
         # History features (simulated)
-        if is_anomaly:
-            features["clipboard_count_1min"] = np.random.uniform(5, 20) / 10.0
-            features["screenshot_count_1min"] = np.random.uniform(5, 15) / 10.0
-            features["file_transfer_count_1min"] = np.random.uniform(2, 10) / 10.0
-            features["clipboard_total_kb_1min"] = np.random.uniform(500, 2000) / 1000.0
-            features["file_transfer_total_mb_1min"] = np.random.uniform(50, 300)
-        else:
-            features["clipboard_count_1min"] = np.random.uniform(0, 5) / 10.0
-            features["screenshot_count_1min"] = np.random.uniform(0, 3) / 10.0
-            features["file_transfer_count_1min"] = np.random.uniform(0, 2) / 10.0
-            features["clipboard_total_kb_1min"] = np.random.uniform(0, 200) / 1000.0
-            features["file_transfer_total_mb_1min"] = np.random.uniform(0, 30)
-        
-        features["label"] = is_anomaly
-        data.append(features)
+        "clipboard_count_1min": draw((0, 5), (5, 20)) / 10.0,
+        "screenshot_count_1min": draw((0, 3), (5, 15)) / 10.0,
+        "file_transfer_count_1min": draw((0, 2), (2, 10)) / 10.0,
+        "clipboard_total_kb_1min": draw((0, 200), (500, 2000)) / 1000.0,
+        "file_transfer_total_mb_1min": draw((0, 30), (50, 300)),
+    }
     
-    return pd.DataFrame(data)
+    # One float32 column per feature, the dtype the trees and the detector score in
+    columns = {name: values.astype(np.float32) for name, values in features.items()}
+    columns["label"] = is_anomaly
+    return pd.DataFrame(columns)
+
+
+def _format_classification_report(confusion: np.ndarray, target_names: List[str]) -> str:
+    """Per-class precision/recall/F1 from a confusion matrix (rows true, columns predicted)."""
+    support = confusion.sum(axis=1)
+    predicted = confusion.sum(axis=0)
+    hits = np.diag(confusion)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.nan_to_num(hits / predicted)
+        recall = np.nan_to_num(hits / support)
+        f1 = np.nan_to_num(2 * precision * recall / (precision + recall))
+    
+    lines = [f"{'':>12} {'precision':>10} {'recall':>10} {'f1-score':>10} {'support':>10}", ""]
+    for name, p, r, f, n in zip(target_names, precision, recall, f1, support):
+        lines.append(f"{name:>12} {p:10.2f} {r:10.2f} {f:10.2f} {n:10d}")
+    lines.append("")
+    lines.append(f"{'accuracy':>12} {'':>10} {'':>10} {hits.sum() / support.sum():10.2f} {support.sum():10d}")
+    scores = np.stack([precision, recall, f1])
+    averages = {
+        "macro avg": scores.mean(axis=1),
+        "weighted avg": scores @ (support / support.sum())
+    }
+    for name, (p, r, f) in averages.items():
+        lines.append(f"{name:>12} {p:10.2f} {r:10.2f} {f:10.2f} {support.sum():10d}")
+    return "\n".join(lines)
 
 
 def train_model():
@@ -123,17 +130,21 @@ def train_model():
     # Evaluate
     print("\n5. Evaluating model...")
     y_pred = model.predict(X_test)
-    y_pred_proba = model.predict_proba(X_test)[:, 1]
+    train_accuracy = float(model.score(X_train, y_train))
+    test_accuracy = float((y_pred == y_test).mean())  # Same as model.score, without a second pass
+    
+    # Confusion counts in one pass: cell 2 * true + predicted
+    confusion = np.bincount(2 * y_test + y_pred, minlength=4).reshape(2, 2)
     
     print("\nClassification Report:")
-    print(classification_report(y_test, y_pred, target_names=["Normal", "Anomaly"]))
+    print(_format_classification_report(confusion, ["Normal", "Anomaly"]))
     
     print("\nConfusion Matrix:")
-    print(confusion_matrix(y_test, y_pred))
+    print(confusion)
     
     # Feature importance
     print("\n6. Feature Importance:")
-    feature_importance = dict(zip(feature_columns, model.feature_importances_))
+    feature_importance = dict(zip(feature_columns, model.feature_importances_.tolist()))  # Plain floats, reused below
     for feature, importance in sorted(feature_importance.items(), 
                                      key=lambda x: x[1], reverse=True):
         print(f"   {feature:30s}: {importance:.4f}")
@@ -143,29 +154,32 @@ def train_model():
     try:
         # Use a subset for SHAP (it can be slow)
         shap_sample_size = min(100, len(X_test))
-        X_test_sample = X_test[:shap_sample_size]
+        X_test_sample = np.ascontiguousarray(X_test[:shap_sample_size], dtype=np.float32)
         
-        explainer = shap.TreeExplainer(model)
+        # Path-dependent mode walks the trees' own cover counts; no background data to marginalize
+        explainer = shap.TreeExplainer(model, feature_perturbation="tree_path_dependent")
         shap_values = explainer.shap_values(X_test_sample)
         
+        # Keep the anomaly class: older SHAP returns a per-class list, newer a (samples, features, classes) array
+        if isinstance(shap_values, list):
+            shap_values = shap_values[1]
+        elif shap_values.ndim == 3:
+            shap_values = np.ascontiguousarray(shap_values[:, :, 1])
+        
         # Save SHAP summary plot data
         shap_data = {
-            "shap_values": shap_values[1].tolist() if isinstance(shap_values, list) else shap_values.tolist(),
+            "shap_values": shap_values,
             "feature_names": feature_columns,
             "sample_size": shap_sample_size
         }
         
         shap_file = Path("models/shap_data.json")
-        with open(shap_file, 'w') as f:
-            json.dump(shap_data, f)
+        shap_file.write_bytes(orjson.dumps(shap_data, option=orjson.OPT_SERIALIZE_NUMPY))
         
         print(f"   SHAP values saved to {shap_file}")
         
         # Print example SHAP values for first prediction
-        if isinstance(shap_values, list):
-            shap_vals = shap_values[1][0]
-        else:
-            shap_vals = shap_values[0]
+        shap_vals = shap_values[0]
         
         print("\n   Example SHAP values (first test sample):")
         for feature, shap_val in zip(feature_columns, shap_vals):
@@ -181,12 +195,12 @@ def train_model():
         "model": model,
         "feature_names": feature_columns,
         "feature_importance": feature_importance,
-        "train_accuracy": model.score(X_train, y_train),
-        "test_accuracy": model.score(X_test, y_test)
+        "train_accuracy": train_accuracy,
+        "test_accuracy": test_accuracy
     }
     
     model_path = Path("models/detection_model.pkl")
-    joblib.dump(model_data, model_path)
+    joblib.dump(model_data, model_path, compress=0, protocol=5)  # Uncompressed so loads skip decompression
     print(f"   Model saved to {model_path}")
     
     # Save metadata
@@ -197,15 +211,14 @@ def train_model():
         "n_features": len(feature_columns),
         "train_samples": len(X_train),
         "test_samples": len(X_test),
-        "train_accuracy": float(model.score(X_train, y_train)),
-        "test_accuracy": float(model.score(X_test, y_test)),
+        "train_accuracy": train_accuracy,
+        "test_accuracy": test_accuracy,
         "feature_names": feature_columns,
-        "feature_importance": {k: float(v) for k, v in feature_importance.items()}
+        "feature_importance": feature_importance
     }
     
     metadata_path = Path("models/model_metadata.json")
-    with open(metadata_path, 'w') as f:
-        json.dump(metadata, f, indent=2)
+    metadata_path.write_bytes(orjson.dumps(metadata, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY))
     print(f"   Metadata saved to {metadata_path}")
     
     print("\n" + "=" * 60)